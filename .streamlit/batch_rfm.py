@@ -0,0 +1,149 @@
+# Headless batch runner: computes scored RFM segments for one or more sales
+# files without the dashboard, spreading partitions over a process pool.
+#
+# Examples:
+#   python batch_rfm.py sales.csv -o segments.parquet
+#   python batch_rfm.py jan.csv feb.csv --partition-by Branch --workers 8 -o by_branch.csv
+#   python batch_rfm.py sales.csv --partition-by City -o by_city.parquet --summary city_segments.csv
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from comparison import GROUP_COLUMNS, compute_grouped_rfm, score_grouped, segment_distribution
+from ingest import filter_transactions, load_sales
+from rfm_engine import (DEFAULT_CUSTOMER_COL, SCORE_BINS, format_scores, merge_sketches, partial_aggregates,
+                        quantile_score_bins, rfm_from_partials, rfm_sketches, score_and_segment)
+
+
+# Function to load and concatenate the input files (through their columnar caches)
+def load_inputs(paths, columns):
+    frames = [load_sales(path, columns) for path in paths]
+    return frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+
+
+# Function to split transactions into a fixed number of buckets: by customer-key
+# hash, or by Branch/City value so that every group lands whole in one bucket
+def partition_transactions(df, partition_by, customer_col, partitions):
+    if partition_by == 'hash':
+        keys = pd.util.hash_pandas_object(df[customer_col], index=False).to_numpy() % partitions
+    else:
+        keys = pd.factorize(df[partition_by], sort=True)[0] % partitions
+    return [part for _, part in df.groupby(keys, sort=True)]
+
+
+# Worker: unscored RFM rows for one hash partition, measured against the
+# global reference date, plus metric sketches when scoring by quantiles
+def hash_partition_task(part, customer_col, current_date, scoring):
+    rfm = rfm_from_partials(partial_aggregates(part, customer_col), customer_col, current_date)
+    return rfm, rfm_sketches(rfm) if scoring == 'quantile' else None
+
+
+# Worker: scored RFM tables for the Branch/City groups of one bucket, from one
+# grouped pass; each group uses its own latest date as its reference date (and
+# its own quantiles)
+def group_partition_task(part, group_col, customer_col, scoring):
+    return score_grouped(compute_grouped_rfm(part, group_col, customer_col), group_col, scoring)
+
+
+# Function to compute scored segments over all partitions in a process pool
+def run_batch(df, partition_by='hash', customer_col=DEFAULT_CUSTOMER_COL, workers=None, partitions=None,
+              scoring='fixed'):
+    workers = workers or os.cpu_count() or 1
+    parts = partition_transactions(df, partition_by, customer_col, partitions or workers)
+
+    if partition_by != 'hash':
+        # Each bucket holds whole groups, so the group tables simply stack
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(
+                group_partition_task,
+                parts,
+                [partition_by] * len(parts),
+                [customer_col] * len(parts),
+                [scoring] * len(parts)
+            ))
+        rfm = pd.concat(results, ignore_index=True)
+        return rfm.sort_values(partition_by, kind='stable', ignore_index=True)
+
+    current_date = df['Date'].max()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(
+            hash_partition_task,
+            parts,
+            [customer_col] * len(parts),
+            [current_date] * len(parts),
+            [scoring] * len(parts)
+        ))
+
+    # Hash partitions hold disjoint customers, so their rows simply stack;
+    # quantile cut points come from the merged sketches of all partitions
+    rfm = pd.concat([rows for rows, _ in results], ignore_index=True)
+    score_bins = SCORE_BINS
+    if scoring == 'quantile':
+        sketches = None
+        for _, partition_sketches in results:
+            sketches = merge_sketches(sketches, partition_sketches)
+        score_bins = quantile_score_bins(sketches)
+    return score_and_segment(rfm, score_bins)
+
+
+# Function to write the result as Parquet (integer score codes) or CSV
+# (display form with 'Other' and RFM_Score, optionally compressed)
+def write_output(rfm, path):
+    if path.endswith('.parquet'):
+        rfm.to_parquet(path, index=False)
+    else:
+        format_scores(rfm).to_csv(path, index=False)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Compute RFM segments for sales files without the dashboard.')
+    parser.add_argument('inputs', nargs='+', help='Sales CSV files')
+    parser.add_argument('-o', '--output', required=True, help='Output file (.parquet, .csv or .csv.gz)')
+    parser.add_argument('--customer-col', default=DEFAULT_CUSTOMER_COL, help='Column identifying a customer')
+    parser.add_argument('--partition-by', default='hash', choices=['hash'] + GROUP_COLUMNS,
+                        help="'hash' for one global RFM table, or a column for one RFM table per group")
+    parser.add_argument('--summary', help='With --partition-by Branch/City, also write the segment '
+                                          'distribution of every group to this CSV file')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--partitions', type=int, default=None, help='Hash partitions (default: workers)')
+    parser.add_argument('--scoring', default='fixed', choices=['fixed', 'quantile'],
+                        help='Fixed score bins, or cut points from approximate quantiles of the data')
+    parser.add_argument('--start-date', help='Only include transactions on or after this date')
+    parser.add_argument('--end-date', help='Only include transactions on or before this date')
+    parser.add_argument('--min-total', type=float, default=float('-inf'), help='Minimum transaction Total')
+    parser.add_argument('--max-total', type=float, default=float('inf'), help='Maximum transaction Total')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    started = time.perf_counter()
+
+    columns = [args.customer_col, 'Date', 'Total']
+    if args.partition_by != 'hash':
+        columns.append(args.partition_by)
+    df = load_inputs(args.inputs, columns)
+
+    if args.start_date or args.end_date or args.min_total > float('-inf') or args.max_total < float('inf'):
+        date_range = (args.start_date or df['Date'].min(), args.end_date or df['Date'].max())
+        df = filter_transactions(df, date_range, (args.min_total, args.max_total))
+    if df.empty:
+        print('No transactions match the given filters.', file=sys.stderr)
+        return 1
+
+    rfm = run_batch(df, args.partition_by, args.customer_col, args.workers, args.partitions, args.scoring)
+    write_output(rfm, args.output)
+    if args.summary and args.partition_by != 'hash':
+        segment_distribution(rfm, args.partition_by).to_csv(args.summary, index=False)
+
+    elapsed = time.perf_counter() - started
+    print(f"Wrote {len(rfm)} customers from {len(df)} transactions to {args.output} in {elapsed:.2f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
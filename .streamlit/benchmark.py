@@ -0,0 +1,263 @@
+# Benchmark suite: generates synthetic sales data with the supermarket schema
+# and times each stage of the RFM pipeline, writing a JSON report.
+#
+# Examples:
+#   python benchmark.py --rows 10000 1000000 --output bench.json
+#   python benchmark.py --rows 1000000 --compare bench.json   # exits 1 on regressions
+#   python benchmark.py --startup --output bench.json         # also time the login page
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from cube import amount_bucket_width, amount_edges, build_cube, compute_rfm_cube
+from ingest import apply_schema, filter_transactions, sort_by_date
+from instrumentation import peak_rss_mb
+from rfm_engine import SCORE_BINS, format_scores, score_rfm
+from segments import (NEW_CUSTOMER_CONDITIONS, SEGMENT_RULES, assign_segments, build_segment_index,
+                      segment_metrics_from_index)
+
+# Value pools for the categorical columns of the sales file
+BRANCH_CITIES = [('A', 'Yangon'), ('B', 'Mandalay'), ('C', 'Naypyitaw')]
+CUSTOMER_TYPES = ['Member', 'Normal']
+GENDERS = ['Female', 'Male']
+PRODUCT_LINES = ['Health and beauty', 'Electronic accessories', 'Home and lifestyle',
+                 'Sports and travel', 'Food and beverages', 'Fashion accessories']
+PAYMENTS = ['Ewallet', 'Cash', 'Credit card']
+
+# Pipeline stages in the order they run, following the dashboard: the quick
+# metrics filter the transactions, the RFM table is answered from the cube and
+# the segment views read the segment index
+STAGES = ['load', 'date_parse', 'filter', 'cube_build', 'rfm_aggregation', 'scoring', 'segmentation',
+          'segment_index', 'segment_metrics', 'export']
+
+# Extra group the dashboard adds to the segment index
+NEW_CUSTOMER_GROUPS = {'New Customers': NEW_CUSTOMER_CONDITIONS}
+
+# Modules the login page should not need to import
+ANALYTICS_MODULES = ['numpy', 'pandas', 'plotly.express', 'pyarrow']
+
+# Run in a fresh interpreter: renders the login page once and reports the time
+# and which analytics modules it imported
+STARTUP_SCRIPT = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+started = time.perf_counter()
+AppTest.from_file(sys.argv[1], default_timeout=60).run()
+seconds = time.perf_counter() - started
+modules = [name for name in sys.argv[2:] if name in sys.modules]
+print(json.dumps({'login_seconds': round(seconds, 6), 'analytics_modules_loaded': modules}))
+"""
+
+
+# Function to assign a customer to every transaction: each customer buys once,
+# and the remaining transactions go to the repeat buyers
+def generate_customer_ids(rng, rows, customers, repeat_rate):
+    customers = min(customers, rows)
+    ids = np.empty(rows, dtype=np.int64)
+    ids[:customers] = np.arange(customers)
+    repeaters = max(1, int(customers * repeat_rate))
+    ids[customers:] = rng.integers(0, repeaters, rows - customers)
+    rng.shuffle(ids)
+    return ids
+
+
+# Function to format integer ids like the sample's Invoice IDs (750-67-8428)
+def format_invoice_ids(ids):
+    digits = pd.Series(ids % 1_000_000_000).astype(str).str.zfill(9)
+    return digits.str[:3] + '-' + digits.str[3:5] + '-' + digits.str[5:]
+
+
+# Function to generate synthetic transactions with the supermarket sales schema
+def generate_transactions(rows, customers, repeat_rate, seed=42, days=90):
+    rng = np.random.default_rng(seed)
+    customer_ids = generate_customer_ids(rng, rows, customers, repeat_rate)
+
+    branch = rng.integers(0, len(BRANCH_CITIES), rows)
+    unit_price = np.round(rng.uniform(10, 100, rows), 2)
+    quantity = rng.integers(1, 11, rows)
+    cogs = np.round(unit_price * quantity, 2)
+    tax = np.round(cogs * 0.05, 4)
+
+    # Dates are formatted once per distinct day and then gathered
+    day_strings = np.array([
+        f"{d.month}/{d.day}/{d.year}" for d in pd.date_range('2019-01-01', periods=days)
+    ])
+    minutes = rng.integers(10 * 60, 21 * 60, rows)
+
+    return pd.DataFrame({
+        'Invoice ID': format_invoice_ids(customer_ids),
+        'Branch': np.array([b for b, _ in BRANCH_CITIES])[branch],
+        'City': np.array([c for _, c in BRANCH_CITIES])[branch],
+        'Customer type': rng.choice(CUSTOMER_TYPES, rows),
+        'Gender': rng.choice(GENDERS, rows),
+        'Product line': rng.choice(PRODUCT_LINES, rows),
+        'Unit price': unit_price,
+        'Quantity': quantity,
+        'Tax 5%': tax,
+        'Total': np.round(cogs + tax, 4),
+        'Date': day_strings[rng.integers(0, days, rows)],
+        'Time': pd.Series(minutes // 60).astype(str).str.zfill(2) + ':' + pd.Series(minutes % 60).astype(str).str.zfill(2),
+        'Payment': rng.choice(PAYMENTS, rows),
+        'cogs': cogs,
+        'gross margin percentage': 4.761904762,
+        'gross income': tax,
+        'Rating': np.round(rng.uniform(4, 10, rows), 1),
+    })
+
+
+# Function to run the pipeline on one CSV file, timing every stage
+def run_pipeline(csv_path, export_path):
+    timings = {}
+    counts = {}
+
+    def timed(stage, func):
+        started = time.perf_counter()
+        result = func()
+        timings[stage] = time.perf_counter() - started
+        counts[stage] = len(result) if hasattr(result, '__len__') else None
+        return result
+
+    raw = timed('load', lambda: pd.read_csv(csv_path))
+    df = timed('date_parse', lambda: sort_by_date(apply_schema(raw)))
+
+    # Filter to the middle of the date range and the lower 90% of amounts; the
+    # amount bounds are cube bucket edges, as the dashboard's slider steps are
+    dates = df['Date']
+    date_range = (dates.min() + (dates.max() - dates.min()) / 10, dates.max() - (dates.max() - dates.min()) / 10)
+    width = amount_bucket_width(float(df['Total'].min()), float(df['Total'].max()))
+    amount_range = amount_edges(float(df['Total'].min()), float(df['Total'].quantile(0.9)), width)
+    timed('filter', lambda: filter_transactions(df, date_range, amount_range))
+
+    cube = timed('cube_build', lambda: build_cube(df, width))
+    rfm = timed('rfm_aggregation', lambda: compute_rfm_cube(cube, date_range, amount_range, width))
+    timed('scoring', lambda: score_rfm(rfm, SCORE_BINS))
+    rfm['Segment'] = timed('segmentation', lambda: assign_segments(rfm, SEGMENT_RULES))
+    segment_index = timed('segment_index', lambda: build_segment_index(rfm, NEW_CUSTOMER_GROUPS))
+    timed('segment_metrics', lambda: segment_metrics_from_index(segment_index))
+
+    def export():
+        format_scores(rfm).to_csv(export_path, index=False)
+        return rfm
+
+    timed('export', export)
+    return timings, counts
+
+
+# Function to benchmark one dataset size
+def run_case(rows, customers, repeat_rate, workdir, seed=42):
+    csv_path = os.path.join(workdir, f'sales_{rows}.csv')
+    generate_transactions(rows, customers, repeat_rate, seed).to_csv(csv_path, index=False)
+    try:
+        timings, counts = run_pipeline(csv_path, os.path.join(workdir, f'rfm_{rows}.csv'))
+    finally:
+        os.remove(csv_path)
+    return {
+        'rows': rows,
+        'customers': customers,
+        'repeat_rate': repeat_rate,
+        'seconds': {stage: round(timings[stage], 6) for stage in STAGES},
+        'total_seconds': round(sum(timings.values()), 6),
+        'row_counts': counts,
+        'peak_memory_mb': round(peak_rss_mb(), 1),
+    }
+
+
+# Function to time the first render of the login page in a new process, as on
+# a freshly started container (with its own empty user database)
+def measure_startup(workdir):
+    app_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+    env = dict(os.environ, RFM_USERS_DB=os.path.join(workdir, 'users.db'))
+    result = subprocess.run(
+        [sys.executable, '-c', STARTUP_SCRIPT, app_path] + ANALYTICS_MODULES,
+        cwd=workdir, env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+# Function to list stages that got slower than the baseline report by more than tolerance
+def find_regressions(report, baseline, tolerance):
+    previous = {case['rows']: case for case in baseline['cases']}
+    regressions = []
+    for case in report['cases']:
+        before = previous.get(case['rows'])
+        if before is None:
+            continue
+        for stage, seconds in case['seconds'].items():
+            old = before['seconds'].get(stage)
+            if old and seconds > old * (1 + tolerance):
+                regressions.append({'rows': case['rows'], 'stage': stage, 'baseline': old, 'current': seconds})
+
+    old = baseline.get('startup', {}).get('login_seconds')
+    seconds = report.get('startup', {}).get('login_seconds')
+    if old and seconds and seconds > old * (1 + tolerance):
+        regressions.append({'rows': None, 'stage': 'startup_login', 'baseline': old, 'current': seconds})
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the RFM pipeline on synthetic sales data.')
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000],
+                        help='Transaction counts to benchmark, e.g. 10000 1000000 10000000')
+    parser.add_argument('--customers', type=float, default=0.3,
+                        help='Distinct customers, as a count or as a fraction of rows if below 1')
+    parser.add_argument('--repeat-rate', type=float, default=0.4,
+                        help='Fraction of customers who buy more than once')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='benchmark_report.json', help='JSON report to write')
+    parser.add_argument('--startup', action='store_true',
+                        help='Also time the first render of the login page in a fresh process')
+    parser.add_argument('--compare', help='Baseline JSON report to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed slowdown per stage before it counts as a regression')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = {
+        'created_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'cases': [],
+    }
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in args.rows:
+            customers = int(rows * args.customers) if args.customers < 1 else int(args.customers)
+            case = run_case(rows, max(customers, 1), args.repeat_rate, workdir, args.seed)
+            report['cases'].append(case)
+            stages = ', '.join(f"{stage} {seconds:.3f}s" for stage, seconds in case['seconds'].items())
+            print(f"{rows} rows: {stages}")
+
+        if args.startup:
+            report['startup'] = measure_startup(workdir)
+            print(f"login page: {report['startup']['login_seconds']:.3f}s, analytics modules loaded: "
+                  f"{', '.join(report['startup']['analytics_modules_loaded']) or 'none'}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            report['regressions'] = find_regressions(report, json.load(f), args.tolerance)
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.output}")
+
+    for regression in report.get('regressions', []):
+        rows = f"{regression['rows']} rows " if regression['rows'] is not None else ''
+        print(f"REGRESSION {rows}{regression['stage']}: "
+              f"{regression['baseline']:.3f}s -> {regression['current']:.3f}s", file=sys.stderr)
+    return 1 if report.get('regressions') else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
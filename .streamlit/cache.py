@@ -0,0 +1,215 @@
+# Process-wide LRU cache shared by every Streamlit session. Cached frames are
+# handed to every session as the same object and must be treated as read-only.
+import hashlib
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Copy-on-Write (always on from pandas 3) keeps frames derived from a cached
+# frame (slices, selections, copies) from writing through to it. It does not
+# protect the cached object itself: assigning a column to it changes it for
+# every session. Cached frames must be copied before they are mutated, e.g.
+# before passing them to helpers that add columns to their argument in place:
+# score_rfm and score_and_segment (rfm_engine), apply_schema (ingest) and
+# apply_increment (incremental).
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option('mode.copy_on_write', True)
+
+# Memory budget and entry limit of the shared cache (overridable per deployment)
+CACHE_MAX_BYTES = int(os.environ.get('RFM_CACHE_MAX_BYTES', 2 * 1024 ** 3))
+CACHE_MAX_ITEMS = int(os.environ.get('RFM_CACHE_MAX_ITEMS', 64))
+
+# Seconds an entry stays valid after it is stored (0 disables expiry)
+CACHE_TTL_SECONDS = float(os.environ.get('RFM_CACHE_TTL_SECONDS', 3600))
+
+# Seconds a holder's pins last without being renewed
+PIN_LEASE_SECONDS = float(os.environ.get('RFM_CACHE_PIN_LEASE_SECONDS', 1800))
+
+# Marker for cache misses, since None is a valid cached value
+_MISSING = object()
+
+
+# Function to hash raw file contents into a cache key
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+# Function to estimate how much memory a cached value holds
+def estimate_bytes(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_bytes(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_bytes(item) for item in value)
+    return sys.getsizeof(value)
+
+
+# Result of a computation in progress, awaited by concurrent requests for the same key
+class _Pending:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+# Bounded LRU cache evicting least recently used entries past a memory budget
+# or entry limit, and dropping entries older than their time-to-live. Entries
+# pinned by a live holder (a session using them) are never evicted, and
+# concurrent requests for a missing key share a single computation.
+class LRUCache:
+    def __init__(self, max_bytes=CACHE_MAX_BYTES, max_items=CACHE_MAX_ITEMS, ttl=CACHE_TTL_SECONDS,
+                 pin_lease=PIN_LEASE_SECONDS):
+        self.max_bytes = max_bytes
+        self.max_items = max_items
+        self.ttl = ttl
+        self.pin_lease = pin_lease
+        self.total_bytes = 0
+        self._entries = OrderedDict()
+        self._pending = {}
+        # holder -> (pinned keys, lease expiry)
+        self._holders = {}
+        # key -> number of holders pinning it
+        self._refcounts = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        with self._lock:
+            return self._lookup(key, default)
+
+    def put(self, key, value, ttl=None):
+        size = estimate_bytes(value)
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            if key in self._entries:
+                self.total_bytes -= self._entries.pop(key)[1]
+            # Values larger than the whole budget are not cached at all
+            if size > self.max_bytes:
+                return value
+            self._entries[key] = (value, size, expires_at)
+            self.total_bytes += size
+            self._evict()
+        return value
+
+    def get_or_compute(self, key, compute, ttl=None):
+        with self._lock:
+            value = self._lookup(key, _MISSING)
+            if value is not _MISSING:
+                return value
+            pending = self._pending.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._pending[key] = _Pending()
+
+        # Another request is already computing this key: wait for its result
+        if not owner:
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.value
+
+        try:
+            pending.value = self.put(key, compute(), ttl)
+            return pending.value
+        except BaseException as e:
+            pending.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._pending[key]
+            pending.done.set()
+
+    # Replace the keys a holder (e.g. a session) pins; the pins lapse unless
+    # renewed within the lease, so abandoned sessions stop holding memory
+    def pin(self, holder, keys, lease=None):
+        lease = self.pin_lease if lease is None else lease
+        with self._lock:
+            self._release(holder)
+            keys = frozenset(keys)
+            self._holders[holder] = (keys, time.monotonic() + lease)
+            for key in keys:
+                self._refcounts[key] = self._refcounts.get(key, 0) + 1
+
+    def unpin(self, holder):
+        with self._lock:
+            self._release(holder)
+
+    def refcount(self, key):
+        with self._lock:
+            self._expire_holders()
+            return self._refcounts.get(key, 0)
+
+    # Summary of the cache's contents for monitoring
+    def stats(self):
+        with self._lock:
+            self._expire_holders()
+            return {
+                'entries': len(self._entries),
+                'bytes': self.total_bytes,
+                'pinned': sum(1 for key in self._entries if key in self._refcounts),
+                'holders': len(self._holders),
+                'in_flight': len(self._pending),
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    # Lookup with the lock held, dropping the entry if it has expired
+    def _lookup(self, key, default):
+        if key not in self._entries:
+            return default
+        value, size, expires_at = self._entries[key]
+        if expires_at is not None and expires_at <= time.monotonic() and key not in self._refcounts:
+            del self._entries[key]
+            self.total_bytes -= size
+            return default
+        self._entries.move_to_end(key)
+        return value
+
+    def _release(self, holder):
+        keys, _ = self._holders.pop(holder, (frozenset(), None))
+        for key in keys:
+            self._refcounts[key] -= 1
+            if self._refcounts[key] == 0:
+                del self._refcounts[key]
+
+    def _expire_holders(self):
+        now = time.monotonic()
+        for holder in [holder for holder, (_, lease_end) in self._holders.items() if lease_end <= now]:
+            self._release(holder)
+
+    def _evict(self):
+        self._expire_holders()
+        # Expired entries go first, then the least recently used ones; pinned
+        # entries stay even if that leaves the cache over budget
+        now = time.monotonic()
+        for key in [key for key, (_, _, expires_at) in self._entries.items()
+                    if expires_at is not None and expires_at <= now and key not in self._refcounts]:
+            self.total_bytes -= self._entries.pop(key)[1]
+        for key in list(self._entries):
+            if self.total_bytes <= self.max_bytes and len(self._entries) <= self.max_items:
+                break
+            if key not in self._refcounts:
+                self.total_bytes -= self._entries.pop(key)[1]
+
+
+# Shared instance used by the dashboard for datasets and derived RFM tables
+shared_cache = LRUCache()
@@ -0,0 +1,139 @@
+# Chart data layer: builds the dashboard's Plotly figures from summaries and
+# samples rather than every customer, and turns them into JSON specs that can
+# be cached and re-rendered without rebuilding the figure.
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+# Points drawn in the 3D scatter
+SCATTER_POINTS = int(os.environ.get('RFM_SCATTER_POINTS', 1000))
+
+# Smallest number of points a segment keeps in the scatter (if it has them),
+# so small segments stay visible next to large ones
+MIN_POINTS_PER_SEGMENT = 20
+
+# Outliers drawn per box (a sample that always includes the most extreme ones)
+OUTLIER_SAMPLE = 100
+
+# Metrics shown in the segment box plots
+BOX_METRICS = ['Recency', 'Frequency', 'Monetary']
+
+
+# Function to compute box-plot statistics (Tukey fences at 1.5 IQR) and a
+# bounded sample of the outliers
+def box_stats(values, seed=42):
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    q1, median, q3 = np.quantile(values, [0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+    outliers = values[(values < inside.min()) | (values > inside.max())]
+    if len(outliers) > OUTLIER_SAMPLE:
+        sample = np.random.default_rng(seed).choice(outliers, OUTLIER_SAMPLE - 2, replace=False)
+        outliers = np.concatenate([[outliers.min(), outliers.max()], sample])
+    return {
+        'q1': q1, 'median': median, 'q3': q3,
+        'lowerfence': inside.min(), 'upperfence': inside.max(),
+        'mean': values.mean(), 'outliers': outliers, 'count': len(values),
+    }
+
+
+# Function to sample rows so that every segment keeps its share of the points
+# (and small segments at least MIN_POINTS_PER_SEGMENT)
+def stratified_sample(rfm, max_points=SCATTER_POINTS, by='Segment', seed=42):
+    if len(rfm) <= max_points:
+        return rfm
+    rng = np.random.default_rng(seed)
+    codes, _ = pd.factorize(rfm[by])
+    counts = np.bincount(codes)
+    quota = np.floor(max_points * counts / len(rfm)).astype(np.int64)
+    quota = np.minimum(np.maximum(quota, MIN_POINTS_PER_SEGMENT), counts)
+
+    # Rows grouped by segment: segment i owns order[starts[i]:starts[i] + counts[i]]
+    order = np.argsort(codes, kind='stable')
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    picks = [order[start + rng.choice(count, n, replace=False)]
+             for start, count, n in zip(starts, counts, quota)]
+    return rfm.iloc[np.sort(np.concatenate(picks))]
+
+
+# Function to build the segment distribution pie from the segment counts
+def segment_pie_figure(segment_counts):
+    return px.pie(
+        segment_counts,
+        values='Count',
+        names='Segment',
+        title='Customer Segments Distribution',
+        color_discrete_sequence=px.colors.qualitative.Bold
+    )
+
+
+# Function to build the 3D RFM scatter from a segment-preserving sample
+def scatter_3d_figure(rfm, max_points=SCATTER_POINTS):
+    sample = stratified_sample(rfm, max_points)
+    title = "3D Visualization of RFM Metrics"
+    if len(sample) < len(rfm):
+        title += f" ({len(sample)} sample points)"
+    return px.scatter_3d(sample, x='Recency', y='Frequency', z='Monetary', color='Segment', title=title)
+
+
+# Function to build the box plots of a segment's metrics from precomputed
+# statistics, so the figure size does not grow with the segment
+def box_figure(rfm, title):
+    fig = go.Figure()
+    colors = px.colors.qualitative.Plotly
+    for i, metric in enumerate(BOX_METRICS):
+        stats = box_stats(rfm[metric].to_numpy())
+        color = colors[i % len(colors)]
+        fig.add_trace(go.Box(
+            name=metric, x=[metric],
+            q1=[stats['q1']], median=[stats['median']], q3=[stats['q3']],
+            lowerfence=[stats['lowerfence']], upperfence=[stats['upperfence']], mean=[stats['mean']],
+            marker_color=color
+        ))
+        fig.add_trace(go.Scatter(
+            x=[metric] * len(stats['outliers']), y=stats['outliers'], mode='markers',
+            marker=dict(color=color, size=4), name=f"{metric} outliers", showlegend=False
+        ))
+    fig.update_layout(title=title)
+    return fig
+
+
+# Function to build the side-by-side segment shares of every compared group
+def segment_share_figure(distribution, group_col):
+    return px.bar(
+        distribution, x=group_col, y='Share (%)', color='Segment', barmode='group',
+        hover_data=['Customers'], title=f"Customer Segments by {group_col}",
+        color_discrete_sequence=px.colors.qualitative.Bold
+    )
+
+
+# Function to build the segment transition heatmap between two snapshots
+def transition_figure(matrix, title):
+    return px.imshow(
+        matrix, text_auto=True, aspect='auto', color_continuous_scale='Blues',
+        labels=dict(x='Segment at end', y='Segment at start', color='Customers'), title=title
+    )
+
+
+# Function to build the segment sizes at every snapshot date
+def snapshot_trend_figure(counts):
+    return px.line(
+        counts, labels=dict(value='Customers', variable='Segment'), markers=True,
+        title='Customers per Segment over Time', color_discrete_sequence=px.colors.qualitative.Bold
+    )
+
+
+# Function to serialize a figure for caching
+def figure_spec(fig):
+    return fig.to_json()
+
+
+# Function to rebuild a figure from a cached spec; it was validated when it
+# was first built, so validation is skipped
+def figure_from_spec(spec):
+    return go.Figure(json.loads(spec), _validate=False)
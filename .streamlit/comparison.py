@@ -0,0 +1,76 @@
+# Comparative RFM across stores: RFM tables, scores and segment distributions
+# for every Branch or City from a single grouped pass over the transactions,
+# each group measured against its own latest transaction date.
+import numpy as np
+import pandas as pd
+
+from rfm_engine import DEFAULT_CUSTOMER_COL, quantile_score_bins, rfm_sketches, score_and_segment
+
+# Columns that can be used to compare groups of stores
+GROUP_COLUMNS = ['Branch', 'City']
+
+
+# Function to calculate the RFM table of every group in one grouped aggregation
+# pass; Recency is measured from each group's own latest transaction
+def compute_grouped_rfm(df, group_col, customer_col=DEFAULT_CUSTOMER_COL):
+    partials = df.groupby([group_col, customer_col], sort=False, observed=True).agg(
+        latest_date=('Date', 'max'),
+        Frequency=('Date', 'size'),
+        Monetary=('Total', 'sum')
+    )
+    groups = partials.index.get_level_values(group_col)
+    # The latest date of a group is the latest of its customers' last purchases
+    reference_dates = partials['latest_date'].groupby(level=group_col, observed=True).max()
+    current_dates = reference_dates.reindex(groups).to_numpy()
+
+    return pd.DataFrame({
+        group_col: np.asarray(groups).astype(str),
+        customer_col: partials.index.get_level_values(customer_col),
+        'Recency': ((current_dates - partials['latest_date'].to_numpy()) // np.timedelta64(1, 'D')).astype(np.int64),
+        'Frequency': partials['Frequency'].to_numpy(),
+        'Monetary': partials['Monetary'].to_numpy()
+    })
+
+
+# Function to score and segment a grouped RFM table. Fixed bins are the same for
+# every group, so the whole table is scored at once; quantile bins come from
+# each group's own distribution.
+def score_grouped(rfm, group_col, scoring='fixed'):
+    if scoring != 'quantile':
+        return score_and_segment(rfm)
+    parts = []
+    for _, positions in rfm.groupby(group_col, sort=False).indices.items():
+        part = rfm.iloc[positions].copy()
+        parts.append(score_and_segment(part, quantile_score_bins(rfm_sketches(part))))
+    return pd.concat(parts, ignore_index=True)
+
+
+# Function to summarize each group: customer count and metric averages
+def group_summary(rfm, group_col):
+    return rfm.groupby(group_col, sort=True).agg(
+        Customers=('Recency', 'size'),
+        **{'Avg Recency': ('Recency', 'mean'),
+           'Avg Frequency': ('Frequency', 'mean'),
+           'Avg Monetary': ('Monetary', 'mean')}
+    ).reset_index()
+
+
+# Function to tabulate each group's customers per segment, as counts and as
+# a percentage of the group
+def segment_distribution(rfm, group_col):
+    counts = pd.crosstab(rfm[group_col], rfm['Segment'])
+    shares = counts.div(counts.sum(axis=1), axis=0) * 100
+    return pd.concat(
+        [counts.stack().rename('Customers'), shares.stack().rename('Share (%)')], axis=1
+    ).reset_index()
+
+
+# Function to run the comparative analysis: the scored RFM table of every group,
+# plus per-group summaries and segment distributions
+def comparative_rfm(df, group_col, customer_col=DEFAULT_CUSTOMER_COL, scoring='fixed'):
+    rfm = score_grouped(compute_grouped_rfm(df, group_col, customer_col), group_col, scoring)
+    return {
+        'rfm': rfm,
+        'summary': group_summary(rfm, group_col),
+        'distribution': segment_distribution(rfm, group_col),
+    }
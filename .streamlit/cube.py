@@ -0,0 +1,133 @@
+# Pre-aggregated daily customer cube: (customer, day, amount bucket, on edge) ->
+# (count, sum, max date). Date and amount filters are answered by summing
+# cube cells instead of scanning the raw transactions.
+import math
+
+import numpy as np
+import pandas as pd
+
+from ingest import CHUNK_SIZE, iter_sales_chunks, load_cached_frame
+from rfm_engine import DEFAULT_CUSTOMER_COL, rfm_from_partials
+
+# Suffix of the cube files written next to the source CSV (formatted with the bucket width)
+CUBE_SUFFIX = '.cube-{width:g}.parquet'
+
+# Approximate number of amount buckets across the Total range
+AMOUNT_BUCKETS = 100
+
+
+# Function to pick a round bucket width (1, 2 or 5 times a power of ten)
+def amount_bucket_width(total_min, total_max, buckets=AMOUNT_BUCKETS):
+    raw_width = (total_max - total_min) / buckets
+    if raw_width <= 0:
+        return 1.0
+    magnitude = 10 ** math.floor(math.log10(raw_width))
+    for step in (1, 2, 5, 10):
+        if raw_width <= step * magnitude:
+            return float(step * magnitude)
+
+
+# Function to get the bucket edges enclosing a Total range; amount filters on
+# the cube are exact when both bounds are edges
+def amount_edges(total_min, total_max, width):
+    low = math.floor(total_min / width) * width
+    high = (math.floor(total_max / width) + 1) * width
+    return float(low), float(high)
+
+
+# Function to aggregate transactions into cube cells. Bucket b holds Totals in
+# [b * width, (b + 1) * width); Totals exactly on the lower edge are kept in
+# cells of their own, so a closed Total range (as filter_transactions uses) can
+# take them from the bucket just past its upper edge.
+def cube_cells(df, width, customer_col=DEFAULT_CUSTOMER_COL):
+    totals = df['Total'].to_numpy()
+    buckets = np.floor(totals / width)
+    cells = pd.DataFrame({
+        customer_col: df[customer_col].to_numpy(),
+        'day': df['Date'].dt.normalize().to_numpy(),
+        'bucket': buckets.astype(np.int32),
+        'edge': totals == buckets * width,
+        'Date': df['Date'].to_numpy(),
+        'Total': df['Total'].to_numpy(),
+    })
+    return cells.groupby([customer_col, 'day', 'bucket', 'edge'], sort=False).agg(
+        count=('Total', 'size'),
+        sum=('Total', 'sum'),
+        max_date=('Date', 'max')
+    ).reset_index()
+
+
+# Function to combine cube cells that may repeat a (customer, day, bucket) key,
+# as the cells of separate chunks do
+def combine_cells(cells, customer_col=DEFAULT_CUSTOMER_COL):
+    return cells.groupby([customer_col, 'day', 'bucket', 'edge'], sort=False).agg(
+        count=('count', 'sum'),
+        sum=('sum', 'sum'),
+        max_date=('max_date', 'max')
+    ).reset_index()
+
+
+# Function to sort cube cells by day so date filters can binary search
+def finish_cube(cells):
+    cells = cells.sort_values('day', kind='stable', ignore_index=True)
+    cells['count'] = pd.to_numeric(cells['count'], downcast='integer')
+    return cells
+
+
+# Function to build the cube from an in-memory transaction frame
+def build_cube(df, width, customer_col=DEFAULT_CUSTOMER_COL):
+    return finish_cube(cube_cells(df, width, customer_col))
+
+
+# Function to build the cube from a CSV in chunks: each chunk is reduced to
+# cells, and the cells of all chunks are combined in a single grouping pass
+def build_cube_streaming(path, width, customer_col=DEFAULT_CUSTOMER_COL, chunksize=CHUNK_SIZE):
+    parts = [cube_cells(chunk, width, customer_col)
+             for chunk in iter_sales_chunks(path, chunksize, usecols=[customer_col, 'Date', 'Total'])]
+    return finish_cube(combine_cells(pd.concat(parts, ignore_index=True), customer_col))
+
+
+# Function to load the cube of a sales file, persisted next to it. It is built
+# from the loaded frame if one is given, otherwise from the CSV in chunks, and
+# rows appended to the file since are added without rebuilding it.
+def load_cube(path, width, customer_col=DEFAULT_CUSTOMER_COL, df=None):
+    def build():
+        if df is not None:
+            return build_cube(df, width, customer_col)
+        return build_cube_streaming(path, width, customer_col)
+
+    def append(cube, rows):
+        if rows.empty:
+            return cube
+        return finish_cube(combine_cells(pd.concat([cube, cube_cells(rows, width, customer_col)], ignore_index=True),
+                                         customer_col))
+
+    return load_cached_frame(path, path + CUBE_SUFFIX.format(width=width), build, append=append)
+
+
+# Function to answer a date and amount filter from the cube, returning
+# per-customer partial aggregates (latest_date, Frequency, Monetary)
+def query_cube(cube, date_range, amount_range, width, customer_col=DEFAULT_CUSTOMER_COL):
+    start = cube['day'].searchsorted(pd.to_datetime(date_range[0]), side='left')
+    end = cube['day'].searchsorted(pd.to_datetime(date_range[1]), side='right')
+    window = cube.iloc[start:end]
+
+    low_bucket = int(round(amount_range[0] / width))
+    high_bucket = int(round(amount_range[1] / width))
+    buckets = window['bucket']
+    # Closed range: whole buckets from the low edge, plus the Totals exactly on the high edge
+    window = window[(buckets >= low_bucket) & ((buckets < high_bucket) | ((buckets == high_bucket) & window['edge']))]
+
+    return window.groupby(customer_col, sort=False, observed=True).agg(
+        latest_date=('max_date', 'max'),
+        Frequency=('count', 'sum'),
+        Monetary=('sum', 'sum')
+    )
+
+
+# Function to calculate the RFM table for a date and amount filter from the cube
+def compute_rfm_cube(cube, date_range, amount_range, width, customer_col=DEFAULT_CUSTOMER_COL):
+    partials = query_cube(cube, date_range, amount_range, width, customer_col)
+    if partials.empty:
+        return pd.DataFrame(columns=[customer_col, 'Recency', 'Frequency', 'Monetary'])
+    return rfm_from_partials(partials, customer_col)
@@ -0,0 +1,825 @@
+# Dashboard pages shown after login. This module holds the analytics stack
+# (pandas, numpy, plotly and the RFM modules), so app.py only imports it once a
+# user is authenticated and the login page renders without it.
+import io
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from cache import content_hash, shared_cache
+from incremental import config_key, refresh_rfm
+from charts import (box_figure, figure_from_spec, figure_spec, scatter_3d_figure, segment_pie_figure,
+                    segment_share_figure, snapshot_trend_figure, transition_figure)
+from comparison import GROUP_COLUMNS, comparative_rfm
+from export import EXPORT_FORMATS, available_formats, export_file, export_file_name
+from explorer import PAGE_SIZES, build_key_index, page_count, page_rows, select_rows, selected_rows, selection_size
+from cube import amount_bucket_width, amount_edges, build_cube, compute_rfm_cube, load_cube
+from ingest import analysis_columns, filter_transactions, frame_ranges, load_ranges, load_sales, read_sales_csv
+from rfm_engine import (QUANTILE_BINS, SCORE_BINS, format_scores, quick_metrics, quantile_score_bins, rfm_sketches,
+                        score_and_segment)
+from segments import (NEW_CUSTOMER_CONDITIONS, SEGMENT_RULES, build_segment_index, segment_counts_from_index,
+                      segment_metrics_from_index, segment_rows)
+from snapshots import SNAPSHOT_FREQUENCIES, rfm_snapshots, snapshot_counts, transition_matrix
+from jobs import ensure_job
+from instrumentation import Profiler, is_admin, latency_summary, prometheus_text
+
+# Column that identifies a customer in the sales data
+CUSTOMER_COL = 'Invoice ID'
+
+# Default sales file loaded when nothing is uploaded
+DATA_PATH = 'supermarket_sales.csv'
+
+# Seconds between checks on a background job while the page waits for it
+JOB_POLL_SECONDS = 0.1
+
+# Files larger than this are streamed in chunks rather than loaded into memory
+STREAMING_THRESHOLD_BYTES = int(os.environ.get('RFM_STREAMING_THRESHOLD_BYTES', 1024 ** 3))
+
+# Function to display the logo
+def display_logo():
+    # Use Streamlit's columns to position the logo
+    cols = st.columns([1, 3])
+    with cols[0]:
+        # Display a placeholder image using st.image with a URL or local path
+        # You can replace this URL with your own logo image path
+        st.image("/Users/desiree/Desktop/Screen Shot 2025-03-03 at 7.44.49 PM.png", width=150)
+
+# Load your data
+# source_version (modification time and size) makes appended data reload.
+# One read-only copy per file version is shared by every session, holding only
+# the columns the analysis uses.
+def load_data(source_version=()):
+    # Replace with your file path
+    # The CSV is parsed once into a columnar cache stored next to it
+    return session_cached(
+        ('dataset', DATA_PATH) + source_version,
+        lambda: load_sales(DATA_PATH, analysis_columns(CUSTOMER_COL))
+    )
+
+# Load the date and amount ranges of a file too large to load at once (scanned
+# once and persisted next to it)
+def load_data_ranges(source_version=()):
+    return session_cached(('ranges', DATA_PATH) + source_version, lambda: load_ranges(DATA_PATH))
+
+# Function to load the analysis columns plus a store group column (Branch or
+# City) of the current dataset
+def load_group_frame(uploaded_file, dataset_key, group_col):
+    columns = analysis_columns(CUSTOMER_COL) + [group_col]
+    if uploaded_file:
+        return session_cached(
+            ('upload', dataset_key, group_col),
+            lambda: read_sales_csv(io.BytesIO(uploaded_file.getvalue()), usecols=columns)
+        )
+    return session_cached(('dataset',) + dataset_key + (group_col,), lambda: load_sales(DATA_PATH, columns))
+
+# Function to fetch a result from the cross-session cache, noting that this
+# session uses it; concurrent requests for the same key share one computation
+def session_cached(key, compute):
+    st.session_state.setdefault('cache_keys', set()).add(key)
+    return shared_cache.get_or_compute(key, compute)
+
+# Function to pin the shared results this session used in its last rerun, so
+# memory-budget eviction skips data that open sessions are still showing
+def pin_session_results():
+    ctx = get_script_run_ctx()
+    holder = ctx.session_id if ctx else 'local'
+    shared_cache.pin(holder, st.session_state.pop('cache_keys', set()))
+
+# Function to hash an uploaded file once per upload: the digest is kept in the
+# session under the upload's file_id, so reruns do not rehash the whole file
+def upload_digest(uploaded_file):
+    digests = st.session_state.setdefault('upload_digests', {})
+    if uploaded_file.file_id not in digests:
+        digests.clear()
+        digests[uploaded_file.file_id] = content_hash(uploaded_file.getvalue())
+    return digests[uploaded_file.file_id]
+
+# Function to identify the current version of a data file
+def source_version(path):
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+# Main application function
+def main():
+    # Time this rerun and each of its stages
+    profiler = Profiler()
+
+    # Display logo in the top left corner of the main page
+    display_logo()
+    
+    # Add logout button to sidebar
+    if st.session_state.get("authenticated", False):
+        st.sidebar.title(f"Welcome, {st.session_state['username']}!")
+        if st.sidebar.button("Logout"):
+            st.session_state["authenticated"] = False
+            st.session_state["username"] = None
+            # Use rerun
+            st.rerun()
+    
+    # Record this rerun, also when the page stops early (st.stop), and show the
+    # performance panel to admins. The rerun is recorded first: session state
+    # is not readable any more once the page has stopped.
+    try:
+        dashboard_page(profiler)
+    finally:
+        profiler.finish()
+    pin_session_results()
+    if is_admin(st.session_state.get("username")):
+        performance_panel(profiler)
+
+# Function to build the dashboard page: data loading, filters and tabs
+def dashboard_page(profiler):
+    st.session_state['cache_keys'] = set()
+
+    # Add upload file functionality
+    uploaded_file = st.sidebar.file_uploader("Upload your customer data CSV", type=["csv"])
+    streaming = False
+    profiler.start('load_data')
+    if uploaded_file:
+        try:
+            # Uploads are keyed by content hash, so each file is parsed once per process
+            # and shared by every session that uploads the same export
+            dataset_key = upload_digest(uploaded_file)
+            df = session_cached(
+                ('upload', dataset_key),
+                lambda: read_sales_csv(io.BytesIO(uploaded_file.getvalue()), usecols=analysis_columns(CUSTOMER_COL))
+            )
+            # Save the uploaded file locally (optional)
+            # with open('uploaded_data.csv', 'wb') as f:
+            #     f.write(uploaded_file.getvalue())
+            st.sidebar.success("Upload Successful")
+        except Exception as e:
+            st.sidebar.error(f"Error uploading file: {e}")
+            uploaded_file = None
+            version = source_version(DATA_PATH)
+            df = load_data(version)
+            dataset_key = (DATA_PATH,) + version
+    else:
+        try:
+            version = source_version(DATA_PATH)
+            dataset_key = (DATA_PATH,) + version
+            # Files above the threshold are streamed in chunks instead of loaded whole
+            streaming = version[1] > STREAMING_THRESHOLD_BYTES
+            if streaming:
+                df = None
+                data_ranges = load_data_ranges(version)
+            else:
+                df = load_data(version)
+        except Exception as e:
+            st.error(f"Error loading data: {e}")
+            st.error("Please make sure 'supermarket_sales.csv' exists in the current directory.")
+            st.stop()
+
+    if not streaming:
+        data_ranges = frame_ranges(df)
+    profiler.stop(rows=None if df is None else len(df))
+
+    # Amount filters are answered from the pre-aggregated cube, so the slider
+    # moves along the cube's amount bucket edges
+    bucket_width = amount_bucket_width(data_ranges['total_min'], data_ranges['total_max'])
+    amount_low, amount_high = amount_edges(data_ranges['total_min'], data_ranges['total_max'], bucket_width)
+
+    # Title and description
+    st.title("📊 RFM Analysis Dashboard")
+    st.markdown("""
+    This dashboard analyzes customer behavior using RFM (Recency, Frequency, Monetary) metrics:
+    * **Recency**: Days since last purchase
+    * **Frequency**: Number of purchases
+    * **Monetary**: Total spending
+    """)
+
+    # Sidebar filters for date and transaction amount
+    st.sidebar.header("Filters")
+
+    # Use try-except for date range
+    try:
+        date_range = st.sidebar.date_input(
+            "Select Date Range",
+            value=(data_ranges['date_min'].date(), data_ranges['date_max'].date()),
+            min_value=data_ranges['date_min'].date(),
+            max_value=data_ranges['date_max'].date(),
+            key='date_range_filter'
+        )
+    except Exception as e:
+        st.sidebar.error(f"Error with date input: {e}")
+        st.stop()
+
+    # Use try-except for slider
+    try:
+        transaction_amount = st.sidebar.slider(
+            "Transaction Amount Range",
+            min_value=amount_low,
+            max_value=amount_high,
+            value=(amount_low, amount_high),
+            step=bucket_width,
+            key='transaction_amount_slider'
+        )
+    except Exception as e:
+        st.sidebar.error(f"Error with slider: {e}")
+        st.stop()
+
+    # Fixed bins use the hard-coded cut points; quantiles take them from the data
+    scoring_mode = st.sidebar.radio(
+        "Scoring Method",
+        options=["Fixed Bins", "Quantiles"],
+        key='scoring_mode'
+    )
+
+    # Aggregate, score (0 = outside the bins) and segment customers; the result is
+    # shared across sessions for the same dataset, filters and scoring/segment rules,
+    # so widgets that only change the view (segment selectbox, search box) reuse it
+    scoring_config = config_key(CUSTOMER_COL, SCORE_BINS, SEGMENT_RULES)
+    rfm_key = ('rfm', dataset_key, tuple(date_range), tuple(transaction_amount), scoring_config)
+    full_history = (
+        tuple(date_range) == (data_ranges['date_min'].date(), data_ranges['date_max'].date()) and
+        tuple(transaction_amount) == (amount_low, amount_high)
+    )
+
+    # Cache keys of the job's results, pinned for this session
+    cube_key = ('cube', dataset_key, bucket_width)
+    base_key = rfm_key
+    if scoring_mode == "Quantiles":
+        rfm_key = rfm_key + ('quantiles', QUANTILE_BINS)
+    summary_key = rfm_key + ('summary',)
+    incremental = not uploaded_file and full_history
+
+    # Job stages: the dataset's cube, the RFM table for the filters, its quantile
+    # rescoring and the segment summaries. They run in a worker thread, so they
+    # use the shared cache directly rather than through session state.
+    def cube_stage(results):
+        # Filters are answered by summing cells of the daily customer cube, which
+        # is built once per dataset (and persisted next to the default file; a
+        # file too large to load is aggregated into it chunk by chunk)
+        if uploaded_file:
+            return shared_cache.get_or_compute(cube_key, lambda: build_cube(df, bucket_width, CUSTOMER_COL))
+        return shared_cache.get_or_compute(
+            cube_key, lambda: load_cube(DATA_PATH, bucket_width, CUSTOMER_COL, df=df)
+        )
+
+    def base_stage(results):
+        if incremental:
+            # The unfiltered view of the sales file is maintained incrementally:
+            # only rows appended since the last refresh are read and rescored
+            return shared_cache.get_or_compute(base_key, lambda: refresh_rfm(DATA_PATH, customer_col=CUSTOMER_COL))
+        return shared_cache.get_or_compute(
+            base_key,
+            lambda: score_and_segment(compute_rfm_cube(
+                results['cube'], date_range, transaction_amount, bucket_width, CUSTOMER_COL
+            ))
+        )
+
+    def rfm_stage(results):
+        base = results['base']
+        if scoring_mode != "Quantiles" or base.empty:
+            return base
+        # Re-score with cut points estimated by quantile sketches over the customers
+        return shared_cache.get_or_compute(
+            rfm_key,
+            lambda: score_and_segment(base.copy(), quantile_score_bins(rfm_sketches(base)))
+        )
+
+    def summary_stage(results):
+        # The segment index (row positions and statistics per segment) and the
+        # tables derived from it depend only on the RFM table above
+        rfm = results['rfm']
+
+        def summarize():
+            segment_index = build_segment_index(rfm, {'New Customers': NEW_CUSTOMER_CONDITIONS})
+            return {
+                'segment_index': segment_index,
+                'segment_counts': segment_counts_from_index(segment_index),
+                'segment_metrics': segment_metrics_from_index(segment_index),
+            }
+
+        return shared_cache.get_or_compute(summary_key, summarize)
+
+    # The RFM table and its summaries are computed by a background job, so the
+    # page renders while it runs; a job for filters that have since changed is
+    # cancelled when the next rerun submits its own
+    use_cube = not incremental
+    stages = ([('cube', cube_stage)] if use_cube else []) + [
+        ('base', base_stage), ('rfm', rfm_stage), ('summary', summary_stage)
+    ]
+    job = ensure_job(st.session_state, 'rfm_job', summary_key, stages)
+    st.session_state['cache_keys'].update(
+        [base_key, rfm_key, summary_key] + ([cube_key] if use_cube else [])
+    )
+
+    # Headline numbers straight from the filtered transactions (not available
+    # when the file is streamed). The incremental view skips them: its refresh
+    # only reads appended rows, while they would rescan the whole ledger.
+    quick = None
+    if df is not None and not incremental:
+        # Cached per dataset and filters, so reruns that only change the view
+        # (search, segment choice, tab switches) do not rescan the transactions
+        profiler.start('quick_metrics')
+        quick = session_cached(
+            ('quick_metrics',) + base_key[1:],
+            lambda: quick_metrics(
+                df if full_history else filter_transactions(df, date_range, transaction_amount), CUSTOMER_COL
+            )
+        )
+        profiler.stop()
+
+        # Check if the filters left any customers
+        if quick['customers'] == 0:
+            job.cancel()
+            st.warning("No data matches the current filters. Please adjust your selection.")
+            st.stop()
+
+    # Create dashboard tabs. Switching tabs reruns the script and only the open
+    # tab is built; the background job keeps running whichever tab is shown
+    tab1, tab2, tab3, tab_compare, tab_migration, tab4 = st.tabs(
+        ["Dashboard", "Data Explorer", "Customer Segments", "Compare Stores", "Segment Migration", "About"],
+        key='dashboard_tab',
+        on_change='rerun'
+    )
+    
+    with tab1:
+        if tab1.open:
+            # Display the metrics from the transactions first, then the exact ones
+            metrics_row = st.empty()
+            if quick is not None:
+                show_metrics(metrics_row, quick['customers'], None, quick['frequency'], quick['monetary'])
+
+            rfm = await_rfm(job, profiler)
+
+            # Calculate and display metrics
+            show_metrics(
+                metrics_row, len(rfm), np.mean(rfm['Recency']), np.mean(rfm['Frequency']), np.mean(rfm['Monetary'])
+            )
+
+            summary = await_stage(job, 'summary', "Summarizing segments")
+
+            # Customer segments pie chart
+            profiler.start('segment_pie')
+            try:
+                st.subheader("Customer Segment Distribution")
+                # Figures are cached as JSON specs per RFM table (and segment)
+                pie_spec = session_cached(
+                    rfm_key + ('figure', 'segment_pie'),
+                    lambda: figure_spec(segment_pie_figure(summary['segment_counts']))
+                )
+                st.plotly_chart(figure_from_spec(pie_spec), use_container_width=True)
+            except Exception as e:
+                st.error(f"Error creating segment pie chart: {e}")
+            profiler.stop()
+
+            # 3D visualization
+            profiler.start('scatter_3d')
+            try:
+                st.subheader("3D RFM Visualization")
+                # Large tables are sampled per segment, so every segment stays visible
+                scatter_spec = session_cached(
+                    rfm_key + ('figure', 'scatter_3d'),
+                    lambda: figure_spec(scatter_3d_figure(rfm))
+                )
+                st.plotly_chart(figure_from_spec(scatter_spec), use_container_width=True)
+            except Exception as e:
+                st.error(f"Error creating 3D scatter plot: {e}")
+            profiler.stop()
+    
+    with tab2:
+        if tab2.open:
+            rfm = await_rfm(job, profiler)
+            summary = await_stage(job, 'summary', "Summarizing segments")
+            st.subheader("RFM Data Explorer")
+        
+            # Search and filter options
+            search_col, filter_col = st.columns(2)
+        
+            with search_col:
+                search_term = st.text_input("Search by Invoice ID", "")
+        
+            with filter_col:
+                segment_filter = st.multiselect(
+                    "Filter by Segment",
+                    options=['All'] + summary['segment_index']['segments'],
+                    default=['All']
+                )
+        
+            # Apply filters as row positions; the search goes through a trigram index
+            # on the customer key, built on the first search of each RFM table
+            key_index = None
+            if search_term:
+                key_index = session_cached(
+                    rfm_key + ('key_index',),
+                    lambda: build_key_index(rfm, CUSTOMER_COL)
+                )
+            selected_segments = segment_filter if segment_filter and 'All' not in segment_filter else None
+            positions = select_rows(
+                rfm, key_index, CUSTOMER_COL, search_term, selected_segments, summary['segment_index']
+            )
+            total_rows = selection_size(rfm, positions)
+
+            # Data table
+            st.markdown("### RFM Data")
+            page_col, size_col = st.columns(2)
+            with size_col:
+                page_size = st.selectbox("Rows per page", options=PAGE_SIZES, index=1, key='explorer_page_size')
+            with page_col:
+                pages = page_count(total_rows, page_size)
+                # A narrower search can leave fewer pages than the page shown before
+                if st.session_state.get('explorer_page', 1) > pages:
+                    st.session_state['explorer_page'] = 1
+                page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, step=1,
+                                       key='explorer_page')
+            st.caption(f"{total_rows} matching customers")
+
+            # Convert to HTML to display without using st.dataframe or st.write;
+            # only the rows of the current page are materialized
+            rfm_html = format_scores(page_rows(rfm, positions, page, page_size)).to_html(index=False)
+            st.markdown(rfm_html, unsafe_allow_html=True)
+        
+            # Export options
+            st.subheader("Export Data")
+            try:
+                download_export(
+                    "Download Filtered RFM Data",
+                    lambda: selected_rows(rfm, positions),
+                    "rfm_filtered_data",
+                    key='download_csv_button'
+                )
+            except Exception as e:
+                st.error(f"Error creating download button: {e}")
+    
+    with tab3:
+        if tab3.open:
+            rfm = await_rfm(job, profiler)
+            summary = await_stage(job, 'summary', "Summarizing segments")
+            st.subheader("Customer Segmentation Analysis")
+        
+            # Segment description
+            segment_descriptions = {
+                "Loyal Customers": "Consistent and dependable customers",
+                "New Customers": "Customers who purchased recently but not made many purchases as yet",
+                "At Risk": "Customers who haven't purchased recently",
+            }
+        
+            # Segment metrics
+            segment_metrics = summary['segment_metrics']
+            segment_index = summary['segment_index']
+        
+            # Add "New Customers" to the segment options if not already there
+            segment_options = segment_metrics['Segment'].tolist()
+            if 'New Customers' not in segment_options:
+                segment_options.append('New Customers')
+            
+            # Display segment details
+            selected_segment = st.selectbox(
+                "Select Customer Segment to Analyze",
+                options=segment_options
+            )
+        
+            # Check if we need to handle New Customers separately (the segment index
+            # holds them as an extra group when no customer is in the segment)
+            new_customers_fallback = selected_segment == 'New Customers' and selected_segment in segment_index['extra']
+            if new_customers_fallback:
+                # Basic metrics for new customers (1-2 purchases), precomputed in the index
+                new_customers_stats = segment_index['stats']['New Customers']
+                new_customers_count = new_customers_stats['count']
+                avg_recency = new_customers_stats['Recency']['mean']
+                avg_frequency = new_customers_stats['Frequency']['mean']
+                avg_monetary = new_customers_stats['Monetary']['mean']
+            
+                st.markdown(f"### {selected_segment}")
+                st.markdown(f"**Description**: {segment_descriptions.get(selected_segment, 'Customers who purchased recently but not made many purchases as yet')}")
+            else:
+                # Display regular segment info
+                segment_data = segment_metrics[segment_metrics['Segment'] == selected_segment].iloc[0]
+            
+                st.markdown(f"### {selected_segment}")
+                st.markdown(f"**Description**: {segment_descriptions.get(selected_segment, 'No description available')}")
+        
+            # Metrics for the selected segment
+            metric_col1, metric_col2, metric_col3, metric_col4 = st.columns(4)
+        
+            if new_customers_fallback:
+                # Show metrics for new customers
+                with metric_col1:
+                    st.metric("Number of Customers", new_customers_count)
+            
+                with metric_col2:
+                    st.metric("Avg Days Since Purchase", f"{avg_recency:.2f} days")
+            
+                with metric_col3:
+                    st.metric("Avg Purchase Frequency", f"{avg_frequency:.2f}")
+            
+                with metric_col4:
+                    st.metric("Avg Spend ($)", f"${avg_monetary:.2f}")
+            else:
+                # Show regular segment metrics
+                with metric_col1:
+                    st.metric("Number of Customers", int(segment_data['Count']))
+            
+                with metric_col2:
+                    st.metric("Avg Days Since Purchase", segment_data['Avg Days Since Purchase'])
+            
+                with metric_col3:
+                    st.metric("Avg Purchase Frequency", segment_data['Avg Purchase Frequency'])
+            
+                with metric_col4:
+                    st.metric("Avg Spend ($)", f"${segment_data['Avg Spend ($)']}")
+        
+            # RFM Distribution for the segment
+            profiler.start('box_plot')
+            try:
+                if new_customers_fallback and new_customers_count == 0:
+                    st.warning("No new customers found in the current data selection.")
+                else:
+                    # The segment index holds the New Customers fallback group too;
+                    # the box statistics are computed once per segment and the
+                    # figure spec is cached
+                    box_spec = session_cached(
+                        rfm_key + ('figure', 'box_plot', selected_segment),
+                        lambda: figure_spec(box_figure(
+                            segment_rows(rfm, segment_index, selected_segment),
+                            f"Distribution of RFM Metrics for {selected_segment}"
+                        ))
+                    )
+                    st.plotly_chart(figure_from_spec(box_spec), use_container_width=True)
+            except Exception as e:
+                st.error(f"Error creating box plot: {e}")
+            profiler.stop()
+        
+            # Marketing recommendations based on segment
+            st.subheader("Marketing Recommendations")
+        
+            recommendations = {
+           
+                "Loyal Customers": [
+                    "Give early access to sales",
+                    "Exclusive discounts and other personalized experiences to shopw appreciation",
+                    "Upgrade them to a card with higher limit",
+                    "Consider brand deal (depending on influence)"
+                ],
+                "New Customers": [
+                     "Encourage credit card application",
+                    "Offer a coupon for free shipping with first online purchase",
+                    "Encourage application download by explaining rewards program potential",
+                    "Register them for emails"
+                ],
+                "At Risk": [
+                    "Send surveys to identify qualms",
+                    "Incentivize them to come back with exclusive promotions",
+                    "Send promotional emails on your products making them more desirable",
+                    "Follow up on most recent purchases to inquire about product satisfaction"
+                ],
+            
+            }
+        
+            segment_recommendations = recommendations.get(selected_segment, ["No specific recommendations available for this segment"])
+        
+            for i, rec in enumerate(segment_recommendations, 1):
+                st.markdown(f"**{i}. {rec}**")
+            
+            # Add data table and export option for New Customers
+            if new_customers_fallback:
+                st.subheader("New Customer Data")
+            
+                if new_customers_count > 0:
+                    # Display the first 50 rows as HTML
+                    rfm_html = format_scores(
+                        rfm.iloc[segment_index['positions']['New Customers'][:50]]
+                    ).to_html(index=False)
+                    st.markdown(rfm_html, unsafe_allow_html=True)
+                
+                    # Export options
+                    st.subheader("Export Data")
+                    try:
+                        download_export(
+                            "Download New Customer Data",
+                            lambda: segment_rows(rfm, segment_index, 'New Customers'),
+                            "new_customers_data",
+                            key='download_new_customer_button'
+                        )
+                    except Exception as e:
+                        st.error(f"Error creating download button: {e}")
+                else:
+                    st.info("No new customer data available to display.")
+
+    with tab_compare:
+        if tab_compare.open:
+            st.subheader("Compare Branches and Cities")
+            st.markdown(
+                "RFM for every store group from one pass over the filtered transactions. "
+                "Recency is measured from each group's own latest purchase."
+            )
+            group_col = st.radio("Compare by", options=GROUP_COLUMNS, horizontal=True, key='compare_by')
+
+            # The comparison is computed only on request, then cached like the RFM table
+            if streaming:
+                st.info("Store comparison is not available for files streamed from disk.")
+            elif st.toggle("Show comparison", key='compare_enabled'):
+                profiler.start('comparison')
+                try:
+                    comparison = session_cached(
+                        ('comparison', group_col) + rfm_key[1:],
+                        lambda: comparative_rfm(
+                            filter_transactions(
+                                load_group_frame(uploaded_file, dataset_key, group_col), date_range, transaction_amount
+                            ),
+                            group_col,
+                            CUSTOMER_COL,
+                            'quantile' if scoring_mode == "Quantiles" else 'fixed'
+                        )
+                    )
+                except Exception as e:
+                    st.error(f"Error comparing stores: {e}")
+                    comparison = None
+                profiler.stop(rows=None if comparison is None else len(comparison['rfm']))
+
+                if comparison is not None:
+                    # One column of metrics per group, side by side
+                    group_summaries = comparison['summary']
+                    for col, (_, group) in zip(st.columns(len(group_summaries)), group_summaries.iterrows()):
+                        with col:
+                            st.markdown(f"#### {group[group_col]}")
+                            st.metric("Customers", int(group['Customers']))
+                            st.metric("Avg Recency", f"{group['Avg Recency']:.2f} days")
+                            st.metric("Avg Frequency", f"{group['Avg Frequency']:.2f}")
+                            st.metric("Avg Monetary", f"${group['Avg Monetary']:.2f}")
+
+                    share_spec = session_cached(
+                        ('comparison', group_col) + rfm_key[1:] + ('figure',),
+                        lambda: figure_spec(segment_share_figure(comparison['distribution'], group_col))
+                    )
+                    st.plotly_chart(figure_from_spec(share_spec), use_container_width=True)
+
+                    st.markdown(comparison['distribution'].round(2).to_html(index=False), unsafe_allow_html=True)
+                    try:
+                        download_export(
+                            f"Download RFM Data by {group_col}",
+                            lambda: comparison['rfm'],
+                            f"rfm_by_{group_col.lower()}",
+                            key='download_comparison_button'
+                        )
+                    except Exception as e:
+                        st.error(f"Error creating download button: {e}")
+
+    with tab_migration:
+        if tab_migration.open:
+            st.subheader("Segment Migration")
+            st.markdown(
+                "Segments of every customer at the end of each week or month of the filtered period, "
+                "from one pass over the transactions. Snapshots use the fixed score bins, so segments "
+                "mean the same thing at every date."
+            )
+            frequency = st.radio(
+                "Snapshot every", options=list(SNAPSHOT_FREQUENCIES), horizontal=True, key='migration_frequency'
+            )
+
+            # The snapshots are computed only on request, then cached like the RFM table
+            if streaming:
+                st.info("Segment migration is not available for files streamed from disk.")
+            elif st.toggle("Show migration", key='migration_enabled'):
+                snapshots_key = ('snapshots', frequency) + base_key[1:]
+                profiler.start('snapshots')
+                try:
+                    snapshots = session_cached(
+                        snapshots_key,
+                        lambda: rfm_snapshots(
+                            filter_transactions(df, date_range, transaction_amount), frequency, CUSTOMER_COL
+                        )
+                    )
+                except Exception as e:
+                    st.error(f"Error computing snapshots: {e}")
+                    snapshots = None
+                profiler.stop(rows=None if snapshots is None else snapshots['codes'].size)
+
+                if snapshots is not None:
+                    as_of_labels = [d.strftime('%Y-%m-%d') for d in snapshots['as_of']]
+                    if len(as_of_labels) > 1:
+                        start_label, end_label = st.select_slider(
+                            "Compare snapshots",
+                            options=as_of_labels,
+                            value=(as_of_labels[0], as_of_labels[-1]),
+                            key='migration_dates'
+                        )
+                    else:
+                        start_label = end_label = as_of_labels[0]
+                    start, end = as_of_labels.index(start_label), as_of_labels.index(end_label)
+
+                    matrix = transition_matrix(snapshots, start, end)
+                    transition_spec = session_cached(
+                        snapshots_key + ('figure', 'transitions', start, end),
+                        lambda: figure_spec(transition_figure(
+                            matrix, f"Segment Transitions from {start_label} to {end_label}"
+                        ))
+                    )
+                    st.plotly_chart(figure_from_spec(transition_spec), use_container_width=True)
+
+                    counts = snapshot_counts(snapshots)
+                    trend_spec = session_cached(
+                        snapshots_key + ('figure', 'trend'),
+                        lambda: figure_spec(snapshot_trend_figure(counts))
+                    )
+                    st.plotly_chart(figure_from_spec(trend_spec), use_container_width=True)
+                    st.markdown(counts.to_html(), unsafe_allow_html=True)
+
+# About Tab
+    with tab4:
+        if tab4.open:
+            st.title("About RFM Analysis")
+            st.markdown("""
+            This section provides information about RFM analysis, its benefits, and how to use this dashboard.
+            """)
+        
+            # Create expandable sections for each category
+            with st.expander("What is RFM Analysis?"):
+                 st.markdown("""
+                The RFM Analysis System categorizes customers based on: Recency (R): How recently a customer made a purchase. Frequency (F): How often a customer makes purchases. Monetary Value (M): How much a customer spends. Traditional segmentation approaches, such as demographic and geographic segmentation, fail to capture the complexities of customer behavior. Demographic data is the data that segments customers based on the attributes like age, gender, income, etc. Attributes like these are useful for identifying the border, more general trends. The geographical segmentation in-of-itself is even more simple, focusing on location-specific patterns but disregarding the nuances of the singular customer. Marketing for customers in a complex and intricate system, and solely focusing on demographic/geographical segmentation could, and often does, result in ineffective marketing techniques.
+                """)
+
+            with st.expander("Benefits of RFM Segmentation"):
+                st.markdown("""
+                An RFM (Recency, Frequency, Monetary) analysis system solves this by segmenting customers based on recency (the customers purchasing habits), frequency (specifically how recently they've made a purchase), and monetary (how often they buy, and how much they spend). This approach allows businesses to identify high-value customers, those at risk of churning, and occasional buyers who could be encouraged to spend more allowing a company to directly refine marketing strategies. This RFM system will allow us to provide an accessible and user-friendly tool that automates customer segmentation which in turn can help businesses focus on valuable customers, save time on manual data analysis, and create personalized marketing strategies. Unlike traditional methods, our system is designed to be accessible, requiring minimal technical expertise, so that companies of all sizes can benefit from behavior-based customer insights.
+                """)
+
+            with st.expander("How to Interpret RFM Scores"):
+                st.markdown("""
+                By automating the RFM analysis process, businesses can quickly identify customer groups, including VIPs, at-risk customers, and dormant buyers. Since some companies don't have the resources or knowledge on how to manually perform RFM analysis, our system will address this need by streamlining RFM scoring and making the insights easier to understand through the use of visual dashboards. It must properly calculate RFM data with high accuracy and normalize and categorize scores into customer segments accurately and efficiently. This allows store owners to identify which products have better customer retention so they can pour more into that area and hopefully see more profit in return. Regional managers can compare the categorizations of customer segments across all stores to then see which tactics are proving to be most successful and implement them across other locations.
+                This system interprets RFM scores on a 1-4 scale:
+                - Recency (1-4): 4 = very recent purchase, 1 = purchase long ago
+                - Frequency (1-4): 4 = frequent purchaser, 1 = one-time buyer
+                - Monetary (1-4): 4 = high spender, 1 = low spender
+    
+                Customer segment rfm scores:
+                - Loyal (R:4, F:4, M:4): Best customers who purchase recently, frequently, and spend the most
+                - At Risk (R:1, F:3-4, M:3-4): Previously valuable customers who haven't purchased recently
+                - New Customers (R:4, F:1, M:1-4): First-time buyers
+            
+                """)
+
+            with st.expander("How This Application Drives Business Success"):
+                st.markdown(""" Our system allows us to address the gaps in traditional segmentation methods using practicality and transformivity. We come across the issue posed by the approaches that are more one-size-fits all and outdated in order to understand the dynamics of the customer base. This system leverages behavior-based metrics and scalable technology, in turn enabling businesses to optimize customer segmentation, improve retention strategies, and drive informed decision-making. This system automates what used to be an overly-complex process, saves time, and ensures accuracy and scalability in order to create the flexibility and potential needed to adapt to real-world business needs. By adopting the RFM analysis system, businesses will have an opportunity to gain both a useful tool, and something more that's crucial to success. Graining precisions, clarity and an understanding of how to make 'smarter' decisions in order for businesses to create a meaningful, lasting relationship with their customers all through the improvement of customer segmentation.
+                """)
+
+# Function to fill the metrics row; values not known yet are shown as '…'
+def show_metrics(placeholder, customers, recency, frequency, monetary):
+    with placeholder.container():
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Total Customers", customers)
+        col2.metric("Average Recency", "…" if recency is None else f"{recency:.2f} days")
+        col3.metric("Average Frequency", f"{frequency:.2f} purchases")
+        col4.metric("Average Monetary", f"${monetary:.2f}")
+
+# Function to wait for the job's RFM table, stopping the page if the job failed
+# or the filters left no customers
+def await_rfm(job, profiler):
+    profiler.start('rfm')
+    try:
+        rfm = await_stage(job, 'rfm', "Computing RFM segments")
+    except Exception as e:
+        st.error(f"Error creating RFM segments: {e}")
+        st.stop()
+    profiler.stop(rows=len(rfm))
+
+    if rfm.empty:
+        st.warning("No data matches the current filters. Please adjust your selection.")
+        st.stop()
+    return rfm
+
+# Function to wait for a stage of a background job. The status line is updated
+# while waiting, which lets a filter change interrupt the wait and rerun the script.
+def await_stage(job, stage, label):
+    status = st.empty()
+    started = time.perf_counter()
+    while not job.wait(stage, JOB_POLL_SECONDS):
+        status.caption(f"{label}… {time.perf_counter() - started:.1f}s")
+    status.empty()
+    return job.result(stage)
+
+# Admin-only sidebar panel with per-stage timings of this rerun and recent latency percentiles
+def performance_panel(profiler):
+    with st.sidebar.expander("Performance (admin)"):
+        st.markdown("**This rerun**")
+        stages = pd.DataFrame(profiler.records).rename(columns={
+            'stage': 'Stage', 'seconds': 'Seconds', 'rows': 'Rows', 'peak_mb': 'Peak Memory (MB)'
+        })
+        st.markdown(stages.to_html(index=False), unsafe_allow_html=True)
+
+        st.markdown("**Recent latency (seconds)**")
+        st.markdown(pd.DataFrame(latency_summary()).to_html(index=False), unsafe_allow_html=True)
+
+        st.markdown("**Shared cache**")
+        st.markdown(pd.DataFrame([shared_cache.stats()]).to_html(index=False), unsafe_allow_html=True)
+
+        st.markdown("**Prometheus metrics**")
+        st.code(prometheus_text(), language="text")
+
+# Download button whose file is only generated, in chunks, when it is clicked
+def download_export(label, get_rows, base_name, key):
+    fmt = st.selectbox("Export Format", options=available_formats(), key=f"{key}_format")
+    st.download_button(
+        label,
+        lambda: export_file(get_rows(), fmt),
+        export_file_name(base_name, fmt),
+        EXPORT_FORMATS[fmt][1],
+        key=key,
+        on_click="ignore"
+    )
@@ -0,0 +1,123 @@
+# Data Explorer helpers: a trigram index over the customer key and
+# row-position selection, so a search or page only touches the rows it shows.
+import math
+
+import numpy as np
+
+# Rows per page offered in the explorer
+PAGE_SIZES = [25, 50, 100, 250]
+
+# Length in bytes of the substrings indexed for the customer key search
+GRAM = 3
+
+
+# Function to build a case-insensitive trigram index over the customer key.
+# Every 3-byte substring of each lowercased key (UTF-8, padded with zero bytes
+# so shorter terms match at the end of a key too) is a gram; the index holds
+# the distinct gram codes in order and, per gram, the rows containing it.
+def build_key_index(rfm, customer_col):
+    encoded = rfm[customer_col].astype(str).str.lower().str.encode('utf-8').to_numpy()
+    width = max((len(key) for key in encoded), default=0) + GRAM - 1
+    keys = np.array(encoded, dtype=f'S{width}')
+    key_bytes = keys.view(np.uint8).reshape(len(keys), width).astype(np.int32)
+
+    codes = np.zeros((len(keys), width - GRAM + 1), dtype=np.int32)
+    for offset in range(GRAM):
+        codes = (codes << 8) | key_bytes[:, offset:offset + width - GRAM + 1]
+    # Grams starting in the padding are not substrings of the key
+    real = key_bytes[:, :width - GRAM + 1] != 0
+    rows = np.broadcast_to(np.arange(len(keys), dtype=np.int32)[:, None], codes.shape)[real]
+    codes = codes[real]
+
+    # Group the occurrences by gram. Sorting the gram's rank (few distinct
+    # values) rather than its code keeps the sort a fast radix sort, and the
+    # stable sort keeps each gram's rows in ascending order.
+    counts = np.bincount(codes, minlength=1 << 8 * GRAM)
+    grams = np.flatnonzero(counts)
+    ranks = (np.cumsum(counts > 0, dtype=np.int32) - 1)[codes]
+    order = np.argsort(ranks.astype(np.uint16 if len(grams) <= 1 << 16 else np.uint32), kind='stable')
+    return {
+        'keys': keys,
+        'grams': grams,
+        'offsets': np.concatenate([[0], np.cumsum(counts[grams])]),
+        'rows': rows[order],
+    }
+
+
+# Function to find the range of grams matching a term of up to GRAM bytes: the
+# exact gram, or for a shorter term every gram that starts with it
+def gram_range(index, term):
+    low = int.from_bytes(term.ljust(GRAM, b'\0'), 'big')
+    high = low + (1 << 8 * (GRAM - len(term)))
+    return np.searchsorted(index['grams'], low), np.searchsorted(index['grams'], high)
+
+
+# Function to list the distinct rows of a range of grams in ascending order
+def gram_rows(index, lo, hi):
+    rows = index['rows'][index['offsets'][lo]:index['offsets'][hi]]
+    if hi - lo == 1:
+        # One gram: rows are ascending, with a key's repeated gram adjacent
+        return rows[np.concatenate([[True], rows[1:] != rows[:-1]])] if len(rows) else rows
+    seen = np.zeros(len(index['keys']), dtype=bool)
+    seen[rows] = True
+    return np.flatnonzero(seen)
+
+
+# Function to find the row positions whose key contains the search term
+# (case-insensitive). Terms of up to three bytes are answered by the index
+# alone; longer ones check only the keys holding their rarest gram.
+def search_keys(index, term):
+    term = term.lower().encode('utf-8')
+    if len(term) <= GRAM:
+        return gram_rows(index, *gram_range(index, term)).astype(np.int64)
+
+    rarest = None
+    for start in range(len(term) - GRAM + 1):
+        lo, hi = gram_range(index, term[start:start + GRAM])
+        size = index['offsets'][hi] - index['offsets'][lo]
+        if rarest is None or size < rarest[0]:
+            rarest = (size, lo, hi)
+    candidates = gram_rows(index, rarest[1], rarest[2])
+    found = np.char.find(index['keys'][candidates], term) >= 0
+    return candidates[found].astype(np.int64)
+
+
+# Function to select the row positions matching the search term and segments;
+# None means every row, so unfiltered views never build a position array.
+# With a segment index, a segment filter alone is answered from its positions.
+def select_rows(rfm, index, customer_col, search_term='', segments=None, segment_index=None):
+    positions = search_keys(index, search_term) if search_term else None
+    if segments:
+        if positions is None and segment_index is not None:
+            groups = [segment_index['positions'][name] for name in segments if name in segment_index['positions']]
+            positions = np.sort(np.concatenate(groups)) if groups else np.empty(0, dtype=np.int64)
+        elif positions is None:
+            positions = np.flatnonzero(rfm['Segment'].isin(segments).to_numpy())
+        else:
+            # Only the matched rows are checked against the segments
+            positions = positions[rfm['Segment'].iloc[positions].isin(segments).to_numpy()]
+    return positions
+
+
+# Function to count the rows in a selection
+def selection_size(rfm, positions):
+    return len(rfm) if positions is None else len(positions)
+
+
+# Function to count the pages needed for a selection
+def page_count(total_rows, page_size):
+    return max(1, math.ceil(total_rows / page_size))
+
+
+# Function to materialize one page of the selection (1-based page number)
+def page_rows(rfm, positions, page, page_size):
+    start = (page - 1) * page_size
+    stop = start + page_size
+    if positions is None:
+        return rfm.iloc[start:stop]
+    return rfm.iloc[positions[start:stop]]
+
+
+# Function to materialize the whole selection (e.g. for export)
+def selected_rows(rfm, positions):
+    return rfm if positions is None else rfm.iloc[positions]
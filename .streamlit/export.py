@@ -0,0 +1,79 @@
+# Chunked exports of RFM tables. Files are only generated when a download is
+# requested and are written a slice of rows at a time into a temporary file,
+# so a large export never holds the whole CSV text in memory.
+import gzip
+import importlib.util
+import os
+import tempfile
+
+from rfm_engine import format_scores
+
+# Rows formatted and written per chunk
+EXPORT_CHUNK_ROWS = int(os.environ.get('RFM_EXPORT_CHUNK_ROWS', 100_000))
+
+# Export formats: label -> (file extension, MIME type)
+EXPORT_FORMATS = {
+    'CSV': ('csv', 'text/csv'),
+    'CSV (gzip)': ('csv.gz', 'application/gzip'),
+    'Parquet': ('parquet', 'application/vnd.apache.parquet'),
+}
+
+
+# Function to list the export formats usable here (Parquet needs pyarrow)
+def available_formats():
+    formats = list(EXPORT_FORMATS)
+    if importlib.util.find_spec('pyarrow') is None:
+        formats.remove('Parquet')
+    return formats
+
+
+# Function to build the download file name for a format
+def export_file_name(base_name, fmt):
+    return f"{base_name}.{EXPORT_FORMATS[fmt][0]}"
+
+
+# Function to iterate over a table in slices of rows
+def iter_chunks(rfm, chunk_rows=EXPORT_CHUNK_ROWS):
+    for start in range(0, max(len(rfm), 1), chunk_rows):
+        yield start, rfm.iloc[start:start + chunk_rows]
+
+
+# Function to write the display form of a table (with 'Other' and RFM_Score)
+# as CSV, one chunk at a time
+def write_csv(rfm, f, chunk_rows=EXPORT_CHUNK_ROWS):
+    for start, chunk in iter_chunks(rfm, chunk_rows):
+        f.write(format_scores(chunk).to_csv(index=False, header=start == 0).encode('utf-8'))
+
+
+# Function to write a table as Parquet (integer score codes), one row group per chunk
+def write_parquet(rfm, f, chunk_rows=EXPORT_CHUNK_ROWS):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    for _, chunk in iter_chunks(rfm, chunk_rows):
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(f, table.schema)
+        writer.write_table(table.cast(writer.schema))
+    writer.close()
+
+
+# Function to write a table in the given export format to a binary file object
+def write_export(rfm, f, fmt, chunk_rows=EXPORT_CHUNK_ROWS):
+    if fmt == 'Parquet':
+        write_parquet(rfm, f, chunk_rows)
+    elif fmt == 'CSV (gzip)':
+        with gzip.GzipFile(fileobj=f, mode='wb') as gz:
+            write_csv(rfm, gz, chunk_rows)
+    else:
+        write_csv(rfm, f, chunk_rows)
+
+
+# Function to generate an export into a temporary file, rewound for reading.
+# The file is unbuffered (a raw file object), which st.download_button accepts.
+def export_file(rfm, fmt, chunk_rows=EXPORT_CHUNK_ROWS):
+    f = tempfile.TemporaryFile(buffering=0)
+    write_export(rfm, f, fmt, chunk_rows)
+    f.seek(0)
+    return f
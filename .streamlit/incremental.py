@@ -0,0 +1,187 @@
+# Incremental RFM maintenance for sales files that grow by appended rows.
+# Per-customer state is kept in a snapshot next to the source file together
+# with a watermark (the byte offset already processed), so a refresh only
+# parses the rows appended since then and rescores the customers they touch.
+import csv
+import io
+import os
+
+import pandas as pd
+
+from ingest import CHUNK_SIZE, apply_schema, read_header, tail_hash
+from rfm_engine import (DEFAULT_CUSTOMER_COL, SCORE_BINS, merge_partials, partial_aggregates,
+                        rfm_from_partials, score_and_segment, score_values)
+from segments import SEGMENT_RULES, assign_segments
+
+# Suffix of the snapshot files written next to the source CSV
+SNAPSHOT_SUFFIX = '.rfm_snapshot.pkl'
+
+# Per-customer columns kept in the snapshot state
+PARTIAL_COLUMNS = ['latest_date', 'Frequency', 'Monetary']
+SCORED_COLUMNS = ['Recency', 'R', 'F', 'M', 'Segment']
+
+
+# File-like wrapper that stops reading after a fixed number of bytes, so a
+# half-written last line is left for the next refresh
+class BoundedReader:
+    def __init__(self, f, limit):
+        self.f = f
+        self.remaining = limit
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.f.read(size)
+        self.remaining -= len(data)
+        return data
+
+
+# Function to find the end of the last complete line before end
+def last_line_end(f, start, end, block_size=1 << 16):
+    position = end
+    while position > start:
+        block_start = max(start, position - block_size)
+        f.seek(block_start)
+        newline = f.read(position - block_start).rfind(b'\n')
+        if newline >= 0:
+            return block_start + newline + 1
+        position = block_start
+    return start
+
+
+# Function to fold the complete rows between offset and the end of the file
+# into per-customer partial aggregates; returns the partials and the new offset
+def aggregate_appended_rows(path, offset, columns, customer_col, chunksize=CHUNK_SIZE):
+    with open(path, 'rb') as f:
+        end = last_line_end(f, offset, os.path.getsize(path))
+        if end <= offset:
+            return None, offset
+
+        f.seek(offset)
+        reader = BoundedReader(f, end - offset)
+        partials = None
+        usecols = [customer_col, 'Date', 'Total']
+        for chunk in pd.read_csv(reader, header=None, names=columns, usecols=usecols, chunksize=chunksize):
+            partials = merge_partials(partials, partial_aggregates(apply_schema(chunk), customer_col))
+    return partials, end
+
+
+# Function to read the bytes after the watermark as a row when they hold every
+# column, as the last line of a file without a trailing newline does. They are
+# not added to the snapshot, so a row still being written is read again (and
+# counted once it is complete) on the next refresh.
+def read_tail_row(path, offset, columns, customer_col):
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        tail = f.read()
+    if not tail.strip():
+        return None
+    fields = next(csv.reader([tail.decode('utf-8', errors='replace')]), [])
+    if len(fields) != len(columns):
+        return None
+    try:
+        row = pd.read_csv(io.BytesIO(tail), header=None, names=columns, usecols=[customer_col, 'Date', 'Total'])
+        row = apply_schema(row)
+    except (ValueError, pd.errors.ParserError):
+        return None
+    if row[[customer_col, 'Date', 'Total']].isna().any(axis=None):
+        return None
+    return partial_aggregates(row, customer_col)
+
+
+# Function to identify the configuration a snapshot was scored with
+def config_key(customer_col, score_bins, rules):
+    return repr((customer_col, score_bins, rules))
+
+
+# Function to load a snapshot, or None if there is none
+def load_snapshot(snapshot_path):
+    try:
+        return pd.read_pickle(snapshot_path)
+    except (FileNotFoundError, EOFError):
+        return None
+
+
+# Function to write a snapshot atomically
+def save_snapshot(snapshot_path, snapshot):
+    tmp_path = snapshot_path + '.tmp'
+    pd.to_pickle(snapshot, tmp_path)
+    os.replace(tmp_path, snapshot_path)
+
+
+# Function to merge new partial aggregates into the per-customer state and
+# rescore only the customers they touch. If the reference date moves, every
+# Recency shifts, so Recency, its score and the segments are refreshed for all
+# customers from the stored state (no transactions are re-read).
+def apply_increment(state, current_date, partials, customer_col,
+                    score_bins=SCORE_BINS, rules=SEGMENT_RULES):
+    known = partials.index.isin(state.index)
+    previous = state.loc[partials.index[known], PARTIAL_COLUMNS] if known.any() else None
+    merged = merge_partials(previous, partials)
+    new_current_date = merged['latest_date'].max()
+    if current_date is not None:
+        new_current_date = max(current_date, new_current_date)
+
+    rows = score_and_segment(rfm_from_partials(merged, customer_col, new_current_date), score_bins, rules)
+    rows = rows.set_index(customer_col)
+    rows['latest_date'] = merged['latest_date'].to_numpy()
+    rows = rows[PARTIAL_COLUMNS + SCORED_COLUMNS]
+
+    updated = rows.index.isin(state.index)
+    if updated.any():
+        state.loc[rows.index[updated], rows.columns] = rows[updated]
+    state = pd.concat([state, rows[~updated]]) if len(state) else rows
+
+    if current_date is not None and new_current_date != current_date:
+        state['Recency'] = (new_current_date - state['latest_date']).dt.days
+        for score_col, (metric, bins, labels) in score_bins.items():
+            if metric == 'Recency':
+                state[score_col] = score_values(state[metric], bins, labels)
+        state['Segment'] = assign_segments(state, rules)
+    return state, new_current_date
+
+
+# Function to bring the RFM table of a growing sales file up to date, reading
+# only the rows appended since the last refresh
+def refresh_rfm(path, customer_col=DEFAULT_CUSTOMER_COL, snapshot_path=None,
+                score_bins=SCORE_BINS, rules=SEGMENT_RULES):
+    snapshot_path = snapshot_path or path + SNAPSHOT_SUFFIX
+    config = config_key(customer_col, score_bins, rules)
+    snapshot = load_snapshot(snapshot_path)
+
+    # Start over if the snapshot is for another configuration or the processed
+    # part of the file is no longer what it was (truncated or rewritten)
+    if (snapshot is None or snapshot['config'] != config
+            or os.path.getsize(path) < snapshot['offset']
+            or tail_hash(path, snapshot['offset']) != snapshot['tail_hash']):
+        columns, offset = read_header(path)
+        snapshot = {
+            'config': config,
+            'columns': columns,
+            'offset': offset,
+            'tail_hash': tail_hash(path, offset),
+            'current_date': None,
+            'state': pd.DataFrame(columns=PARTIAL_COLUMNS + SCORED_COLUMNS),
+        }
+
+    partials, offset = aggregate_appended_rows(path, snapshot['offset'], snapshot['columns'], customer_col)
+    if partials is not None:
+        snapshot['state'], snapshot['current_date'] = apply_increment(
+            snapshot['state'], snapshot['current_date'], partials, customer_col, score_bins, rules
+        )
+        snapshot['offset'] = offset
+        snapshot['tail_hash'] = tail_hash(path, offset)
+        save_snapshot(snapshot_path, snapshot)
+
+    # A last row without a trailing newline is past the watermark; it is added
+    # to a copy of the state on every refresh until a newline completes it
+    state = snapshot['state']
+    tail = read_tail_row(path, snapshot['offset'], snapshot['columns'], customer_col)
+    if tail is not None:
+        state, _ = apply_increment(state.copy(), snapshot['current_date'], tail, customer_col, score_bins, rules)
+
+    rfm = state[['Recency', 'Frequency', 'Monetary', 'R', 'F', 'M', 'Segment']]
+    rfm = rfm.rename_axis(customer_col).reset_index()
+    return rfm
@@ -0,0 +1,330 @@
+# Ingest layer: parses sales CSVs into typed frames and keeps a columnar
+# cache next to each source file so the CSV is only parsed once
+import hashlib
+import io
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# Explicit date format of the sales exports (e.g. 1/5/2019)
+DATE_FORMAT = '%m/%d/%Y'
+
+# Low-cardinality text columns stored as categoricals
+CATEGORICAL_COLUMNS = ['Branch', 'City', 'Customer type', 'Gender', 'Product line', 'Payment']
+
+# Numeric columns kept at full precision because they are summed into Monetary
+EXACT_COLUMNS = ['Total']
+
+# Columns the RFM analysis reads besides the customer key
+ANALYSIS_COLUMNS = ['Date', 'Total']
+
+# Rows read per chunk when streaming a file that does not fit in memory
+CHUNK_SIZE = 500_000
+
+# Suffix of the cache files written next to the source CSV
+CACHE_SUFFIX = '.parquet'
+
+# Suffix of the Date and Total ranges persisted for files that are streamed
+RANGES_SUFFIX = '.ranges.parquet'
+
+# Bytes before the end of the cached rows hashed to detect a rewritten (not
+# appended) file
+TAIL_BYTES = 4096
+
+# Bumped whenever the cached layout changes, so older caches are rebuilt
+CACHE_VERSION = 3
+
+
+# Function to parse the Date column, falling back to inference for other formats
+def parse_dates(column):
+    try:
+        return pd.to_datetime(column, format=DATE_FORMAT)
+    except (ValueError, TypeError):
+        return pd.to_datetime(column)
+
+
+# Function to give a freshly read sales frame compact, typed columns
+def apply_schema(df):
+    if 'Date' in df.columns:
+        df['Date'] = parse_dates(df['Date'])
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    for col in df.select_dtypes(include='number').columns:
+        if col in EXACT_COLUMNS:
+            continue
+        if pd.api.types.is_integer_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], downcast='integer')
+        else:
+            df[col] = pd.to_numeric(df[col], downcast='float')
+    return df
+
+
+# Function to sort a sales frame by Date and mark it, so date filters can
+# binary search instead of scanning
+def sort_by_date(df):
+    if not df['Date'].is_monotonic_increasing:
+        df = df.sort_values('Date', kind='stable', ignore_index=True)
+    df.attrs['sorted_by'] = 'Date'
+    return df
+
+
+# Function to list the columns an RFM analysis keyed by customer_col needs
+def analysis_columns(customer_col):
+    return [customer_col] + [col for col in ANALYSIS_COLUMNS if col != customer_col]
+
+
+# Function to read a sales CSV (path or file-like object) into a typed, date-sorted
+# frame; usecols projects the file to the given columns while parsing
+def read_sales_csv(source, usecols=None):
+    return sort_by_date(apply_schema(pd.read_csv(source, usecols=usecols)))
+
+
+# Function to stream a sales CSV as typed chunks; usecols limits the parsed columns
+def iter_sales_chunks(source, chunksize=CHUNK_SIZE, usecols=None):
+    for chunk in pd.read_csv(source, chunksize=chunksize, usecols=usecols):
+        yield apply_schema(chunk)
+
+
+# Function to keep transactions inside a date range and a Total range.
+# Date-sorted frames are sliced with a binary search, so only the rows in the
+# selected window are checked against the Total range.
+def filter_transactions(df, date_range, amount_range):
+    positions = filter_positions(df, date_range, amount_range)
+    # A slice is a view of the frame; only a scattered selection is gathered
+    return df.iloc[positions]
+
+
+# Function to find the row positions of transactions inside a date range and a
+# Total range: a slice when the matching rows are contiguous (a date window of
+# a date-sorted frame), otherwise an array of positions
+def filter_positions(df, date_range, amount_range):
+    start_date = pd.to_datetime(date_range[0])
+    end_date = pd.to_datetime(date_range[1])
+
+    if df.attrs.get('sorted_by') == 'Date':
+        start = df['Date'].searchsorted(start_date, side='left')
+        end = df['Date'].searchsorted(end_date, side='right')
+        totals = df['Total'].to_numpy()[start:end]
+        keep = (totals >= amount_range[0]) & (totals <= amount_range[1])
+        if keep.all():
+            return slice(start, end)
+        return np.flatnonzero(keep) + start
+
+    dates = df['Date'].to_numpy()
+    totals = df['Total'].to_numpy()
+    keep = ((dates >= start_date.to_datetime64()) & (dates <= end_date.to_datetime64()) &
+            (totals >= amount_range[0]) & (totals <= amount_range[1]))
+    return np.flatnonzero(keep)
+
+
+# Function to find the Date and Total ranges of a sales frame
+def frame_ranges(df):
+    return {
+        'date_min': df['Date'].min(),
+        'date_max': df['Date'].max(),
+        'total_min': float(df['Total'].min()),
+        'total_max': float(df['Total'].max()),
+    }
+
+
+# Function to combine the ranges of two parts of a sales file
+def merge_ranges(ranges, other):
+    return {
+        'date_min': min(ranges['date_min'], other['date_min']),
+        'date_max': max(ranges['date_max'], other['date_max']),
+        'total_min': min(ranges['total_min'], other['total_min']),
+        'total_max': max(ranges['total_max'], other['total_max']),
+    }
+
+
+# Function to find the Date and Total ranges of a sales CSV in one streaming pass
+def scan_ranges(source, chunksize=CHUNK_SIZE):
+    ranges = None
+    for chunk in iter_sales_chunks(source, chunksize, usecols=['Date', 'Total']):
+        if chunk.empty:
+            continue
+        chunk_ranges = frame_ranges(chunk)
+        ranges = chunk_ranges if ranges is None else merge_ranges(ranges, chunk_ranges)
+    if ranges is None:
+        raise ValueError('The sales file has no transactions.')
+    return ranges
+
+
+# Function to load the ranges of a sales CSV too large to load at once. They
+# are persisted next to it like the columnar cache, and rows appended since
+# are merged in without rescanning the file.
+def load_ranges(path):
+    def append(cached, rows):
+        if rows.empty:
+            return cached
+        return pd.DataFrame([merge_ranges(cached.iloc[0].to_dict(), frame_ranges(rows))])
+
+    row = load_cached_frame(path, path + RANGES_SUFFIX, lambda: pd.DataFrame([scan_ranges(path)]),
+                            append=append).iloc[0]
+    return {
+        'date_min': row['date_min'],
+        'date_max': row['date_max'],
+        'total_min': float(row['total_min']),
+        'total_max': float(row['total_max']),
+    }
+
+
+# Function to hash a file's contents in blocks
+def file_hash(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# Function to hash the bytes just before an offset, to tell a file that was
+# appended to from one that was rewritten
+def tail_hash(path, offset):
+    with open(path, 'rb') as f:
+        f.seek(max(0, offset - TAIL_BYTES))
+        return hashlib.sha256(f.read(offset - max(0, offset - TAIL_BYTES))).hexdigest()
+
+
+# Function to read the header of a sales CSV and the offset where rows start
+def read_header(path):
+    with open(path, 'rb') as f:
+        header = f.readline()
+        return pd.read_csv(io.BytesIO(header), nrows=0).columns.tolist(), f.tell()
+
+
+# Function to read the rows of a sales CSV from a byte offset (the start of a
+# line) to the end of the file into a typed frame
+def read_rows_from(path, offset):
+    columns, _ = read_header(path)
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        try:
+            return apply_schema(pd.read_csv(f, header=None, names=columns))
+        except pd.errors.EmptyDataError:
+            return pd.DataFrame(columns=columns)
+
+
+# Function to read the cache metadata, or None if there is none
+def read_cache_meta(meta_path):
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    return meta if meta.get('version') == CACHE_VERSION else None
+
+
+# Function to check whether the cache still matches the source file
+def cache_is_fresh(path, meta_path):
+    meta = read_cache_meta(meta_path)
+    if meta is None:
+        return False
+
+    stat = os.stat(path)
+    if meta.get('mtime_ns') == stat.st_mtime_ns and meta.get('size') == stat.st_size:
+        return True
+
+    # The file was touched; only rebuild if its contents actually changed. A
+    # cache extended by appended rows records only the hash of its last bytes.
+    if meta.get('size') != stat.st_size:
+        return False
+    if meta.get('sha256'):
+        unchanged = meta['sha256'] == file_hash(path)
+    else:
+        unchanged = meta.get('tail_sha256') == tail_hash(path, stat.st_size)
+    if unchanged:
+        write_cache_meta(path, meta_path, meta.get('sha256'))
+    return unchanged
+
+
+# Function to find the offset up to which the cache covers a file that has
+# only grown by whole rows since the cache was written, or None if the file
+# changed in any other way
+def cache_append_offset(path, meta_path):
+    meta = read_cache_meta(meta_path)
+    if meta is None or not meta.get('tail_sha256'):
+        return None
+    offset = meta['size']
+    if os.path.getsize(path) <= offset:
+        return None
+    with open(path, 'rb') as f:
+        f.seek(offset - 1)
+        # The cached rows must end with a complete line
+        if f.read(1) != b'\n':
+            return None
+    return offset if tail_hash(path, offset) == meta['tail_sha256'] else None
+
+
+# Function to record which version of the source a cache was built from
+def write_cache_meta(path, meta_path, sha256):
+    stat = os.stat(path)
+    tmp_path = meta_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'version': CACHE_VERSION, 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size,
+                   'sha256': sha256, 'tail_sha256': tail_hash(path, stat.st_size)}, f)
+    os.replace(tmp_path, meta_path)
+
+
+# Function to write a frame to the Parquet cache and record the source version
+def write_cached_frame(path, cache_path, df, sha256):
+    try:
+        tmp_path = cache_path + '.tmp'
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, cache_path)
+        write_cache_meta(path, cache_path + '.json', sha256)
+    except (ImportError, OSError):
+        # Caching is best effort; the built frame is still usable
+        pass
+
+
+# Function to load a frame derived from a source file through a Parquet cache,
+# calling build() only when the cache is missing or the source has changed
+# columns, if given, limits the returned frame to those columns (the cache is
+# columnar, so the others are not even read). If the source only grew by
+# appended rows and append is given, append(cached, rows) extends the cached
+# frame with the new rows instead of rebuilding it.
+def load_cached_frame(path, cache_path, build, columns=None, append=None):
+    meta_path = cache_path + '.json'
+
+    try:
+        if os.path.exists(cache_path):
+            if cache_is_fresh(path, meta_path):
+                return pd.read_parquet(cache_path, columns=columns)
+            offset = cache_append_offset(path, meta_path) if append is not None else None
+            if offset is not None:
+                df = append(pd.read_parquet(cache_path), read_rows_from(path, offset))
+                # Only the appended bytes were read, so the whole-file hash is not known
+                write_cached_frame(path, cache_path, df, None)
+                return df if columns is None else df[columns]
+    except ImportError:
+        # No parquet engine installed, so there is no cache to use
+        df = build()
+        return df if columns is None else df[columns]
+
+    df = build()
+    write_cached_frame(path, cache_path, df, file_hash(path))
+    return df if columns is None else df[columns]
+
+
+# Function to add appended rows to a cached sales frame, keeping it date-sorted
+# in file order like a full read
+def append_sales(cached, rows):
+    df = pd.concat([cached, rows], ignore_index=True)
+    for col in CATEGORICAL_COLUMNS:
+        # Categoricals with different categories concatenate as object columns
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+    return sort_by_date(df)
+
+
+# Function to load a sales CSV through its columnar cache, optionally projected
+# to the given columns
+def load_sales(path, columns=None):
+    df = load_cached_frame(path, path + CACHE_SUFFIX, lambda: read_sales_csv(path), columns, append_sales)
+    # The cache is written date-sorted
+    df.attrs['sorted_by'] = 'Date'
+    return df
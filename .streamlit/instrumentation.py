@@ -0,0 +1,178 @@
+# Lightweight hot-path instrumentation for the dashboard. Each rerun records
+# wall time, memory and row counts per stage; records are emitted as JSON log
+# lines and folded into process-wide latency samples that can be exported as
+# Prometheus text metrics. The login page imports this module too, so numpy is
+# only imported where percentiles are computed.
+import json
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from collections import defaultdict, deque
+
+# Usernames allowed to see the performance panel (comma separated)
+ADMIN_USERS = {name.strip() for name in os.environ.get('RFM_ADMIN_USERS', '').split(',') if name.strip()}
+
+# Optional file rewritten with Prometheus text metrics after each rerun
+# (e.g. for the node_exporter textfile collector)
+METRICS_FILE = os.environ.get('RFM_METRICS_FILE')
+
+# Trace Python/numpy allocations per stage; slower, so off by default and the
+# process peak RSS is reported instead
+TRACE_MEMORY = os.environ.get('RFM_TRACE_MEMORY') == '1'
+
+# Recent durations kept per stage for percentiles
+SAMPLE_WINDOW = 1000
+QUANTILES = (0.5, 0.9, 0.99)
+
+logger = logging.getLogger('rfm.perf')
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+_samples = defaultdict(lambda: deque(maxlen=SAMPLE_WINDOW))
+_totals = defaultdict(lambda: [0, 0.0])
+_lock = threading.Lock()
+
+# Whether this process has not rendered a page yet (its first page is a cold start)
+_cold = True
+
+
+# Function to check whether a user may see the performance panel
+def is_admin(username):
+    return username in ADMIN_USERS
+
+
+# Function to read the process's peak resident memory in MB
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+# Function to read how long this process has been running, from its start time
+# in /proc (None where that is not available)
+def process_uptime():
+    try:
+        with open('/proc/self/stat') as f:
+            # Fields after the command name; the start time (in clock ticks
+            # after boot) is field 22 of the whole line
+            started_ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime') as f:
+            system_uptime = float(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+    return system_uptime - started_ticks / os.sysconf('SC_CLK_TCK')
+
+
+# Function to add one stage duration to the process-wide samples
+def observe(stage, seconds):
+    with _lock:
+        _samples[stage].append(seconds)
+        _totals[stage][0] += 1
+        _totals[stage][1] += seconds
+
+
+# Function to record how long a page (e.g. the login page) took to render
+# within its script run. The first page of a process also reports the process
+# uptime, i.e. the time from the container starting to that page being shown.
+def record_page_load(page, seconds):
+    global _cold
+    with _lock:
+        cold, _cold = _cold, False
+    observe(f'{page}_page', seconds)
+    event = {'event': 'rfm_page_load', 'page': page, 'seconds': round(seconds, 6), 'cold': cold}
+    if cold:
+        uptime = process_uptime()
+        if uptime is not None:
+            event['process_uptime'] = round(uptime, 3)
+    logger.info(json.dumps(event))
+
+
+# Function to summarize recent latencies per stage (count and percentiles)
+def latency_summary():
+    import numpy as np
+
+    with _lock:
+        samples = {stage: list(values) for stage, values in _samples.items()}
+        totals = {stage: tuple(values) for stage, values in _totals.items()}
+    summary = []
+    for stage, values in samples.items():
+        row = {'stage': stage, 'count': totals[stage][0]}
+        for q, value in zip(QUANTILES, np.quantile(values, QUANTILES)):
+            row[f'p{int(q * 100)}'] = round(float(value), 4)
+        summary.append(row)
+    return summary
+
+
+# Function to render the collected latencies as Prometheus text metrics
+def prometheus_text():
+    import numpy as np
+
+    with _lock:
+        samples = {stage: list(values) for stage, values in _samples.items()}
+        totals = {stage: tuple(values) for stage, values in _totals.items()}
+    lines = [
+        '# HELP rfm_stage_seconds Wall time of dashboard stages per rerun.',
+        '# TYPE rfm_stage_seconds summary',
+    ]
+    for stage, values in sorted(samples.items()):
+        for q, value in zip(QUANTILES, np.quantile(values, QUANTILES)):
+            lines.append(f'rfm_stage_seconds{{stage="{stage}",quantile="{q}"}} {value:.6f}')
+        lines.append(f'rfm_stage_seconds_sum{{stage="{stage}"}} {totals[stage][1]:.6f}')
+        lines.append(f'rfm_stage_seconds_count{{stage="{stage}"}} {totals[stage][0]}')
+    lines.append('# HELP rfm_peak_rss_megabytes Peak resident memory of the dashboard process.')
+    lines.append('# TYPE rfm_peak_rss_megabytes gauge')
+    lines.append(f'rfm_peak_rss_megabytes {peak_rss_mb():.1f}')
+    return '\n'.join(lines) + '\n'
+
+
+# Records the stages of one dashboard rerun
+class Profiler:
+    def __init__(self):
+        self.records = []
+        self._current = None
+        self.started = time.perf_counter()
+        if TRACE_MEMORY and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    # Start timing a stage (stages do not nest)
+    def start(self, stage):
+        if TRACE_MEMORY:
+            tracemalloc.reset_peak()
+        self._current = (stage, time.perf_counter())
+
+    # Finish the current stage, optionally with the number of rows it produced
+    def stop(self, rows=None):
+        if self._current is None:
+            return
+        stage, started = self._current
+        self._current = None
+        seconds = time.perf_counter() - started
+        if TRACE_MEMORY:
+            peak_mb = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        else:
+            peak_mb = peak_rss_mb()
+
+        record = {'stage': stage, 'seconds': round(seconds, 6), 'rows': rows, 'peak_mb': round(peak_mb, 1)}
+        self.records.append(record)
+        observe(stage, seconds)
+        logger.info(json.dumps({'event': 'rfm_stage', **record}))
+
+    # Record the wall time of the whole rerun (since the profiler was created)
+    # and refresh the metrics file
+    def finish(self):
+        total = time.perf_counter() - self.started
+        observe('rerun_total', total)
+        logger.info(json.dumps({'event': 'rfm_rerun', 'seconds': round(total, 6), 'stages': len(self.records)}))
+        if METRICS_FILE:
+            tmp_path = METRICS_FILE + '.tmp'
+            with open(tmp_path, 'w') as f:
+                f.write(prometheus_text())
+            os.replace(tmp_path, METRICS_FILE)
@@ -0,0 +1,87 @@
+# Background jobs for the dashboard. A job runs a list of named stages in a
+# worker thread; the page can show each stage's result as soon as it is ready,
+# and a job whose inputs are no longer wanted is cancelled between stages.
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Worker threads shared by all sessions (the heavy lifting happens in pandas
+# and numpy, which release the GIL for most of it)
+JOB_WORKERS = int(os.environ.get('RFM_JOB_WORKERS', min(4, os.cpu_count() or 1)))
+
+_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix='rfm-job')
+
+
+# Raised when the result of a cancelled job is requested
+class JobCancelled(Exception):
+    pass
+
+
+# A sequence of stages run in the background; each stage is a function of the
+# results of the stages before it
+class Job:
+    def __init__(self, key, stages):
+        self.key = key
+        self.results = {}
+        self.error = None
+        self._cancelled = threading.Event()
+        self._ready = {name: threading.Event() for name, _ in stages}
+        self._future = _executor.submit(self._run, stages)
+
+    @property
+    def failed(self):
+        return self.error is not None
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    # Stop the job: it is dropped if it has not started yet, and otherwise
+    # ends before its next stage
+    def cancel(self):
+        self._cancelled.set()
+        self._future.cancel()
+        self._finish()
+
+    # Wait up to timeout seconds for a stage; returns whether it is done
+    def wait(self, stage, timeout=None):
+        return self._ready[stage].wait(timeout)
+
+    # Result of a finished stage, re-raising the job's error if it failed
+    def result(self, stage):
+        self.wait(stage)
+        if self.error is not None:
+            raise self.error
+        if stage not in self.results:
+            raise JobCancelled(f"Job {self.key!r} was cancelled before stage {stage!r}")
+        return self.results[stage]
+
+    def _run(self, stages):
+        try:
+            for name, func in stages:
+                if self._cancelled.is_set():
+                    break
+                self.results[name] = func(self.results)
+                self._ready[name].set()
+        except Exception as e:
+            self.error = e
+        finally:
+            self._finish()
+
+    # Release anyone waiting on stages that will not run
+    def _finish(self):
+        for ready in self._ready.values():
+            ready.set()
+
+
+# Function to get the job for a key from a session's job slot (e.g. an entry
+# of st.session_state), cancelling the slot's previous job if it was for other
+# inputs or failed
+def ensure_job(session_state, slot, key, stages):
+    job = session_state.get(slot)
+    if job is not None and job.key == key and not job.failed and not job.cancelled:
+        return job
+    if job is not None:
+        job.cancel()
+    job = session_state[slot] = Job(key, stages)
+    return job
@@ -0,0 +1,170 @@
+# RFM engine: computes Recency, Frequency and Monetary per customer
+import numpy as np
+import pandas as pd
+
+from segments import SEGMENT_RULES, assign_segments
+from sketches import TDigest
+
+# Default column used to identify a customer
+DEFAULT_CUSTOMER_COL = 'Invoice ID'
+
+# Score code reserved for values that fall outside the bins
+OUT_OF_BIN = 0
+
+# Bin edges and score labels for each score column: (metric, bins, labels)
+SCORE_BINS = {
+    'R': ('Recency', [0, 30, 90, 180, 365], [1, 2, 3, 4]),
+    'F': ('Frequency', [1, 2, 5, 10, 20], [4, 3, 2, 1]),
+    'M': ('Monetary', [0, 500, 1000, 5000, 10000], [4, 3, 2, 1]),
+}
+
+# Number of score levels in quantile scoring (quartiles keep the 1-4 scale
+# the segment rules are written for)
+QUANTILE_BINS = 4
+
+
+# Function to reduce transactions to per-customer partial aggregates
+# (last purchase date, purchase count and spend), indexed by customer
+def partial_aggregates(df, customer_col=DEFAULT_CUSTOMER_COL):
+    return df.groupby(customer_col, sort=False, observed=True).agg(
+        latest_date=('Date', 'max'),
+        Frequency=('Date', 'size'),
+        Monetary=('Total', 'sum')
+    )
+
+
+# Function to fold a new set of partial aggregates into the running ones
+def merge_partials(running, partials):
+    if running is None:
+        return partials
+    combined = pd.concat([running, partials])
+    return combined.groupby(level=0, sort=False).agg(
+        latest_date=('latest_date', 'max'),
+        Frequency=('Frequency', 'sum'),
+        Monetary=('Monetary', 'sum')
+    )
+
+
+# Function to turn per-customer partial aggregates into the RFM table
+def rfm_from_partials(partials, customer_col=DEFAULT_CUSTOMER_COL, current_date=None):
+    if current_date is None:
+        current_date = partials['latest_date'].max()
+
+    rfm = pd.DataFrame({
+        customer_col: partials.index,
+        'Recency': (current_date - partials['latest_date']).dt.days.to_numpy(),
+        'Frequency': partials['Frequency'].to_numpy(),
+        'Monetary': partials['Monetary'].to_numpy()
+    })
+    return rfm
+
+
+# Function to calculate the RFM table with a single grouped aggregation pass
+def compute_rfm(df, customer_col=DEFAULT_CUSTOMER_COL, current_date=None):
+    if current_date is None:
+        current_date = df['Date'].max()
+    return rfm_from_partials(partial_aggregates(df, customer_col), customer_col, current_date)
+
+
+# Function to compute the headline averages of an RFM table straight from the
+# transactions, without grouping by customer: mean Frequency is purchases per
+# customer and mean Monetary is spend per customer (Recency needs the grouping)
+def quick_metrics(df, customer_col=DEFAULT_CUSTOMER_COL):
+    customers = df[customer_col].nunique()
+    return {
+        'customers': customers,
+        'frequency': len(df) / customers if customers else np.nan,
+        'monetary': df['Total'].sum() / customers if customers else np.nan,
+    }
+
+
+# Function to calculate the RFM table from an iterable of transaction chunks.
+# Memory is bounded by the number of customers, not the number of transactions.
+# chunk_filter, if given, is applied to every chunk before it is aggregated.
+def compute_rfm_streaming(chunks, customer_col=DEFAULT_CUSTOMER_COL, chunk_filter=None):
+    running = None
+    for chunk in chunks:
+        if chunk_filter is not None:
+            chunk = chunk_filter(chunk)
+        if chunk.empty:
+            continue
+        running = merge_partials(running, partial_aggregates(chunk, customer_col))
+
+    if running is None:
+        return pd.DataFrame(columns=[customer_col, 'Recency', 'Frequency', 'Monetary'])
+    return rfm_from_partials(running, customer_col)
+
+
+# Function to map values onto small integer scores using right-closed bins
+# (the lowest edge is included, like pd.cut with include_lowest=True)
+def score_values(values, bins, labels):
+    values = np.asarray(values, dtype=float)
+    bins = np.asarray(bins, dtype=float)
+    codes = np.asarray([OUT_OF_BIN] + list(labels), dtype=np.int8)
+
+    positions = np.searchsorted(bins, values, side='left')
+    positions[values == bins[0]] = 1
+    positions[(positions >= len(bins)) | np.isnan(values)] = 0
+    return codes[positions]
+
+
+# Function to add integer R, F and M score columns to the RFM table
+def score_rfm(rfm, score_bins=SCORE_BINS):
+    for score_col, (metric, bins, labels) in score_bins.items():
+        rfm[score_col] = score_values(rfm[metric], bins, labels)
+    return rfm
+
+
+# Function to build the display/export form of the scores, with 'Other' for
+# out-of-bin values and the combined RFM_Score string
+def format_scores(rfm, score_cols=('R', 'F', 'M')):
+    formatted = rfm.copy()
+    for score_col in score_cols:
+        codes = rfm[score_col].to_numpy()
+        formatted[score_col] = np.where(codes == OUT_OF_BIN, 'Other', codes.astype(str)).astype(object)
+    combined = formatted[score_cols[0]]
+    for score_col in score_cols[1:]:
+        combined = combined + formatted[score_col]
+    formatted.insert(formatted.columns.get_loc(score_cols[-1]) + 1, 'RFM_Score', combined)
+    return formatted
+
+
+# Function to build the scored and segmented RFM table for a set of transactions
+def build_rfm_table(df, customer_col=DEFAULT_CUSTOMER_COL, current_date=None,
+                    score_bins=SCORE_BINS, rules=SEGMENT_RULES):
+    rfm = compute_rfm(df, customer_col=customer_col, current_date=current_date)
+    return score_and_segment(rfm, score_bins, rules)
+
+
+# Function to add scores and segments to an unscored RFM table
+def score_and_segment(rfm, score_bins=SCORE_BINS, rules=SEGMENT_RULES):
+    rfm = score_rfm(rfm, score_bins)
+    rfm['Segment'] = assign_segments(rfm, rules)
+    return rfm
+
+
+# Function to build a mergeable quantile sketch for each metric of an RFM table
+def rfm_sketches(rfm, score_bins=SCORE_BINS):
+    return {metric: TDigest().update(rfm[metric].to_numpy()) for metric, _, _ in score_bins.values()}
+
+
+# Function to combine the sketches of two chunks or partitions
+def merge_sketches(running, sketches):
+    if running is None:
+        return sketches
+    for metric, sketch in sketches.items():
+        running[metric].merge(sketch)
+    return running
+
+
+# Function to derive data-driven score bins from metric sketches. The cut points
+# are the sketch quantiles and the labels keep the direction of the fixed bins.
+def quantile_score_bins(sketches, score_bins=SCORE_BINS, n_bins=QUANTILE_BINS):
+    quantile_bins = {}
+    for score_col, (metric, _, labels) in score_bins.items():
+        edges = sketches[metric].quantile(np.linspace(0, 1, n_bins + 1)).tolist()
+        levels = list(range(1, n_bins + 1))
+        if labels[0] > labels[-1]:
+            levels.reverse()
+        quantile_bins[score_col] = (metric, edges, levels)
+    return quantile_bins
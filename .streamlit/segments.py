@@ -0,0 +1,137 @@
+# Customer segmentation from RFM scores using a declarative rule table
+import operator
+
+import numpy as np
+import pandas as pd
+
+# Label for customers that match no rule
+DEFAULT_SEGMENT = 'Others'
+
+# Customers with few purchases. The New Customers views fall back to this
+# condition when no customer is in the New Customers segment.
+NEW_CUSTOMER_CONDITIONS = {'Frequency': ('<=', 2)}
+
+# Segment rules are checked in order and the first match wins.
+# Each condition maps a column of the rfm table to (operator, value).
+# R, F and M are integer scores where 0 means the value fell outside the bins.
+SEGMENT_RULES = [
+    {'name': 'Loyal Customers', 'conditions': {'R': ('>=', 2), 'F': ('>=', 3), 'M': ('>=', 3)}},
+    {'name': 'At Risk', 'conditions': {'R': ('<=', 2), 'F': ('>=', 2)}},
+    {'name': 'New Customers', 'conditions': NEW_CUSTOMER_CONDITIONS},
+]
+
+# Quantiles of each metric precomputed per segment
+SUMMARY_QUANTILES = (0.25, 0.5, 0.75)
+
+# Metrics summarized per segment
+SUMMARY_METRICS = ('Recency', 'Frequency', 'Monetary')
+
+# Operators that can be used in a rule condition
+RULE_OPERATORS = {
+    '>=': operator.ge,
+    '<=': operator.le,
+    '>': operator.gt,
+    '<': operator.lt,
+    '==': operator.eq,
+    '!=': operator.ne,
+    'in': lambda column, values: column.isin(values),
+}
+
+
+# Function to turn a rule table into one boolean mask per rule
+def compile_rules(rfm, rules=SEGMENT_RULES):
+    masks = []
+    for rule in rules:
+        mask = np.ones(len(rfm), dtype=bool)
+        for column, (op, value) in rule['conditions'].items():
+            if op not in RULE_OPERATORS:
+                raise ValueError(f"Unknown operator '{op}' in segment rule '{rule['name']}'")
+            mask &= np.asarray(RULE_OPERATORS[op](rfm[column], value), dtype=bool)
+        masks.append(mask)
+    return masks
+
+
+# Function to label every customer with the first segment rule it matches
+def assign_segments(rfm, rules=SEGMENT_RULES, default=DEFAULT_SEGMENT):
+    if not rules:
+        return pd.Series(default, index=rfm.index, dtype=object)
+    masks = compile_rules(rfm, rules)
+    names = [rule['name'] for rule in rules]
+    labels = np.select(masks, names, default=default).astype(object)
+    return pd.Series(labels, index=rfm.index)
+
+
+# Function to list the segment labels in rule order, ending with the default,
+# so that a segment code is a position in this list
+def segment_names(rules=SEGMENT_RULES, default=DEFAULT_SEGMENT):
+    return [rule['name'] for rule in rules] + [default]
+
+
+# Function to code every customer with the position of its segment in
+# segment_names (int8, for compact storage of many segmentations)
+def assign_segment_codes(rfm, rules=SEGMENT_RULES):
+    if not rules:
+        return np.zeros(len(rfm), dtype=np.int8)
+    return np.select(compile_rules(rfm, rules), list(range(len(rules))), default=len(rules)).astype(np.int8)
+
+
+# Function to index an RFM table by segment: the row positions of every segment
+# (from one sort of the segment codes) and each segment's count, means and
+# quantiles. extra_groups adds groups defined by rule conditions, for
+# groups that may not exist as a segment, e.g. {'New Customers': NEW_CUSTOMER_CONDITIONS}.
+def build_segment_index(rfm, extra_groups=None):
+    codes, names = pd.factorize(rfm['Segment'], sort=True)
+    # Small integer codes sort with a linear-time radix sort
+    order = np.argsort(codes.astype(np.int16 if len(names) < 2 ** 15 else np.int64), kind='stable')
+    bounds = np.concatenate([[0], np.cumsum(np.bincount(codes[codes >= 0], minlength=len(names)))])
+    positions = {name: order[bounds[i]:bounds[i + 1]] for i, name in enumerate(names)}
+
+    extra = []
+    for name, conditions in (extra_groups or {}).items():
+        if name not in positions:
+            positions[name] = np.flatnonzero(compile_rules(rfm, [{'name': name, 'conditions': conditions}])[0])
+            extra.append(name)
+
+    stats = {name: group_stats(rfm, group_positions) for name, group_positions in positions.items()}
+    return {'segments': list(names), 'extra': extra, 'positions': positions, 'stats': stats}
+
+
+# Function to compute the count, mean and quantiles of each metric for a group of rows
+def group_stats(rfm, positions):
+    stats = {'count': len(positions)}
+    for metric in SUMMARY_METRICS:
+        values = rfm[metric].to_numpy()[positions]
+        if len(values) == 0:
+            stats[metric] = {'mean': 0.0, 'quantiles': [np.nan] * len(SUMMARY_QUANTILES)}
+        else:
+            stats[metric] = {'mean': float(values.mean()),
+                             'quantiles': np.quantile(values, SUMMARY_QUANTILES).tolist()}
+    return stats
+
+
+# Function to get the rows of one segment (or extra group) from the index
+def segment_rows(rfm, segment_index, name):
+    return rfm.iloc[segment_index['positions'][name]]
+
+
+# Function to build the segment metrics table (customer count and rounded
+# metric averages per segment) from a segment index
+def segment_metrics_from_index(segment_index):
+    stats = segment_index['stats']
+    names = segment_index['segments']
+    return pd.DataFrame({
+        'Segment': names,
+        'Avg Days Since Purchase': [stats[name]['Recency']['mean'] for name in names],
+        'Avg Purchase Frequency': [stats[name]['Frequency']['mean'] for name in names],
+        'Avg Spend ($)': [stats[name]['Monetary']['mean'] for name in names],
+        'Count': [stats[name]['count'] for name in names],
+    }).round({'Avg Days Since Purchase': 1, 'Avg Purchase Frequency': 1, 'Avg Spend ($)': 2})
+
+
+# Function to list segments by customer count, largest first
+def segment_counts_from_index(segment_index):
+    counts = pd.DataFrame({
+        'Segment': segment_index['segments'],
+        'Count': [segment_index['stats'][name]['count'] for name in segment_index['segments']],
+    })
+    return counts.sort_values('Count', ascending=False, kind='stable', ignore_index=True)
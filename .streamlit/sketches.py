@@ -0,0 +1,70 @@
+# Mergeable approximate quantile sketch (a merging t-digest). A digest keeps
+# at most about `compression` weighted centroids, can absorb values in batches
+# and can be merged with digests built on other chunks or in other processes.
+import numpy as np
+
+# Default compression: more centroids give more accurate quantiles
+DEFAULT_COMPRESSION = 200
+
+
+class TDigest:
+    def __init__(self, compression=DEFAULT_COMPRESSION):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.min = np.inf
+        self.max = -np.inf
+
+    @property
+    def count(self):
+        return float(self.weights.sum())
+
+    # Add a batch of values
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self._compress(np.concatenate([self.means, values]),
+                       np.concatenate([self.weights, np.ones(len(values))]))
+        return self
+
+    # Fold another digest into this one
+    def merge(self, other):
+        if other.count == 0:
+            return self
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress(np.concatenate([self.means, other.means]),
+                       np.concatenate([self.weights, other.weights]))
+        return self
+
+    # Estimate the values at the given quantiles (0 to 1)
+    def quantile(self, qs):
+        qs = np.atleast_1d(np.asarray(qs, dtype=float))
+        if self.count == 0:
+            return np.full(len(qs), np.nan)
+        cumulative = np.cumsum(self.weights) - self.weights / 2
+        positions = np.concatenate([[0.0], cumulative, [self.count]])
+        values = np.concatenate([[self.min], self.means, [self.max]])
+        return np.interp(qs * self.count, positions, values)
+
+    # Merge centroids so that each covers at most one unit of the k1 scale
+    # function, which keeps centroids small near the tails and large in the middle
+    def _compress(self, means, weights):
+        order = np.argsort(means, kind='stable')
+        means = means[order]
+        weights = weights[order]
+        total = weights.sum()
+
+        q = (np.cumsum(weights) - weights / 2) / total
+        k = self.compression / (2 * np.pi) * np.arcsin(2 * q - 1)
+        groups = np.floor(k - k.min()).astype(np.int64)
+
+        group_weights = np.bincount(groups, weights=weights)
+        group_sums = np.bincount(groups, weights=means * weights)
+        keep = group_weights > 0
+        self.weights = group_weights[keep]
+        self.means = group_sums[keep] / self.weights
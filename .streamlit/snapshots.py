@@ -0,0 +1,189 @@
+# Time-sliced RFM snapshots for tracking how customers move between segments.
+# The transactions are swept once in date order while per-customer state (last
+# purchase, purchase count and spend) is carried from one as-of date to the
+# next, so each snapshot only adds the transactions since the previous one and
+# a rescoring of the customers seen so far. A snapshot is stored as one int8
+# segment code per customer.
+#
+# Examples:
+#   python snapshots.py sales.csv --frequency Weekly -o weekly_snapshots.npz
+#   python snapshots.py sales.csv --frequency Monthly --transitions migration.csv
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from batch_rfm import load_inputs
+from rfm_engine import DEFAULT_CUSTOMER_COL, SCORE_BINS, score_rfm
+from segments import SEGMENT_RULES, assign_segment_codes, segment_names
+
+# Period ends used as as-of dates: weeks end on Sunday, months on their last day
+SNAPSHOT_FREQUENCIES = {
+    'Weekly': pd.offsets.Week(weekday=6),
+    'Monthly': pd.offsets.MonthEnd(),
+}
+
+# Segment code and label of customers with no purchase up to an as-of date
+INACTIVE_CODE = -1
+INACTIVE_LABEL = 'Not Yet Active'
+
+
+# Function to list the as-of dates of a period: every period end in it, plus
+# the last day if the final period is incomplete
+def snapshot_dates(start, end, frequency='Weekly'):
+    offset = SNAPSHOT_FREQUENCIES[frequency]
+    start = pd.Timestamp(start).normalize()
+    end = pd.Timestamp(end).normalize()
+    dates = pd.date_range(offset.rollforward(start), end, freq=offset)
+    if len(dates) == 0 or dates[-1] < end:
+        dates = dates.append(pd.DatetimeIndex([end]))
+    return dates
+
+
+# Function to compute the segment of every customer at each as-of date in one
+# sweep over the transactions. Recency is measured from the as-of date and only
+# purchases on or before it count. Returns the as-of dates, the customer keys,
+# the segment labels and a (snapshots x customers) array of segment codes.
+def compute_snapshots(df, as_of_dates, customer_col=DEFAULT_CUSTOMER_COL, score_bins=SCORE_BINS,
+                      rules=SEGMENT_RULES):
+    as_of_dates = pd.DatetimeIndex(as_of_dates)
+    customers, keys = pd.factorize(df[customer_col])
+    days = df['Date'].to_numpy().astype('datetime64[D]').astype(np.int64)
+    totals = df['Total'].to_numpy(dtype=float)
+    as_of_days = as_of_dates.to_numpy().astype('datetime64[D]').astype(np.int64)
+
+    # Transactions in date order; snapshot j adds those between as-of dates j-1 and j
+    if not (days[1:] >= days[:-1]).all():
+        order = np.argsort(days, kind='stable')
+        customers, days, totals = customers[order], days[order], totals[order]
+    bounds = np.searchsorted(days, as_of_days, side='right')
+
+    # Cumulative per-customer state up to the current as-of date
+    latest = np.full(len(keys), np.iinfo(np.int64).min)
+    frequency = np.zeros(len(keys), dtype=np.int64)
+    monetary = np.zeros(len(keys))
+    codes = np.full((len(as_of_dates), len(keys)), INACTIVE_CODE, dtype=np.int8)
+
+    start = 0
+    for i, (as_of, end) in enumerate(zip(as_of_days, bounds)):
+        batch = customers[start:end]
+        if len(batch):
+            np.maximum.at(latest, batch, days[start:end])
+            frequency += np.bincount(batch, minlength=len(keys))
+            monetary += np.bincount(batch, weights=totals[start:end], minlength=len(keys))
+        start = end
+
+        active = np.flatnonzero(frequency)
+        if len(active) == 0:
+            continue
+        rfm = pd.DataFrame({
+            'Recency': as_of - latest[active],
+            'Frequency': frequency[active],
+            'Monetary': monetary[active],
+        })
+        codes[i, active] = assign_segment_codes(score_rfm(rfm, score_bins), rules)
+
+    return {
+        'as_of': as_of_dates,
+        'customers': np.asarray(keys),
+        'segments': segment_names(rules),
+        'codes': codes,
+    }
+
+
+# Function to compute weekly or monthly snapshots over the whole date range of
+# a set of transactions
+def rfm_snapshots(df, frequency='Weekly', customer_col=DEFAULT_CUSTOMER_COL, score_bins=SCORE_BINS,
+                  rules=SEGMENT_RULES):
+    as_of_dates = snapshot_dates(df['Date'].min(), df['Date'].max(), frequency)
+    return compute_snapshots(df, as_of_dates, customer_col, score_bins, rules)
+
+
+# Function to count the customers of every segment at each as-of date
+def snapshot_counts(snapshots):
+    n_segments = len(snapshots['segments'])
+    counts = [np.bincount(row[row != INACTIVE_CODE], minlength=n_segments) for row in snapshots['codes']]
+    return pd.DataFrame(counts, index=snapshots['as_of'].rename('As of'), columns=snapshots['segments'])
+
+
+# Function to cross-tabulate the segments of every customer at two snapshots
+# (positions in the as-of dates). Rows are the earlier segment, with customers
+# who had not purchased yet in their own row; columns are the later segment.
+def transition_matrix(snapshots, start=0, end=-1):
+    n_segments = len(snapshots['segments'])
+    before = snapshots['codes'][start].astype(np.int64) + 1
+    after = snapshots['codes'][end].astype(np.int64) + 1
+    # Codes shifted by one so that the inactive code becomes row/column 0
+    cells = np.bincount(before * (n_segments + 1) + after, minlength=(n_segments + 1) ** 2)
+    labels = [INACTIVE_LABEL] + snapshots['segments']
+    matrix = pd.DataFrame(
+        cells.reshape(n_segments + 1, n_segments + 1),
+        index=pd.Index(labels, name='From'),
+        columns=pd.Index(labels, name='To')
+    )
+    # Nobody becomes inactive again, so that column is always empty
+    return matrix.drop(columns=INACTIVE_LABEL)
+
+
+# Function to save snapshots as a compressed NumPy archive
+def save_snapshots(snapshots, path):
+    np.savez_compressed(
+        path,
+        as_of=snapshots['as_of'].to_numpy().astype('datetime64[D]'),
+        customers=snapshots['customers'].astype(str),
+        segments=np.asarray(snapshots['segments'], dtype=str),
+        codes=snapshots['codes']
+    )
+
+
+# Function to load snapshots saved by save_snapshots
+def load_snapshots(path):
+    with np.load(path) as archive:
+        return {
+            'as_of': pd.DatetimeIndex(archive['as_of'].astype('datetime64[ns]')),
+            'customers': archive['customers'].astype(object),
+            'segments': archive['segments'].tolist(),
+            'codes': archive['codes'],
+        }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Compute RFM segment snapshots and the migration between them.')
+    parser.add_argument('inputs', nargs='+', help='Sales CSV files')
+    parser.add_argument('-o', '--output', help='Write the snapshots to this .npz file')
+    parser.add_argument('--transitions', help='Write the transition matrix between the first and last '
+                                              'snapshot to this CSV file')
+    parser.add_argument('--frequency', default='Weekly', choices=list(SNAPSHOT_FREQUENCIES),
+                        help='Take a snapshot at the end of every week or month')
+    parser.add_argument('--customer-col', default=DEFAULT_CUSTOMER_COL, help='Column identifying a customer')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    started = time.perf_counter()
+
+    df = load_inputs(args.inputs, [args.customer_col, 'Date', 'Total'])
+    if df.empty:
+        print('No transactions in the given files.', file=sys.stderr)
+        return 1
+
+    snapshots = rfm_snapshots(df, args.frequency, args.customer_col)
+    if args.output:
+        save_snapshots(snapshots, args.output)
+    matrix = transition_matrix(snapshots)
+    if args.transitions:
+        matrix.to_csv(args.transitions)
+    else:
+        print(matrix.to_string())
+
+    elapsed = time.perf_counter() - started
+    print(f"Computed {len(snapshots['as_of'])} snapshots of {len(snapshots['customers'])} customers "
+          f"from {len(df)} transactions in {elapsed:.2f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
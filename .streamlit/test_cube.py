@@ -0,0 +1,52 @@
+# Regression checks for cube filters against filtering the transactions
+import numpy as np
+import pandas as pd
+import pytest
+
+from cube import amount_edges, build_cube, build_cube_streaming, compute_rfm_cube
+from ingest import filter_transactions, sort_by_date
+from rfm_engine import DEFAULT_CUSTOMER_COL, compute_rfm
+
+WIDTH = 10.0
+
+
+# Transactions of a few customers with many Totals exactly on bucket edges
+def make_sales(rows=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    totals = rng.uniform(0, 200, rows).round(2)
+    on_edge = rng.random(rows) < 0.3
+    totals[on_edge] = rng.integers(0, 21, on_edge.sum()) * WIDTH
+    return sort_by_date(pd.DataFrame({
+        DEFAULT_CUSTOMER_COL: rng.choice([f'C{i:03d}' for i in range(150)], rows),
+        'Date': pd.Timestamp('2019-01-01') + pd.to_timedelta(rng.integers(0, 90, rows), unit='D'),
+        'Total': totals,
+    }))
+
+
+def sorted_rfm(rfm):
+    rfm = rfm.sort_values(DEFAULT_CUSTOMER_COL, ignore_index=True)
+    return rfm.astype({'Recency': 'int64', 'Frequency': 'int64', 'Monetary': 'float64'})
+
+
+def expected_rfm(df, date_range, amount_range):
+    return sorted_rfm(compute_rfm(filter_transactions(df, date_range, amount_range)))
+
+
+@pytest.mark.parametrize('amount_range', [(0.0, 210.0), (50.0, 120.0), (10.0, 20.0), (100.0, 100.0)])
+@pytest.mark.parametrize('date_range', [('2019-01-01', '2019-03-31'), ('2019-02-03', '2019-02-17')])
+def test_cube_matches_filtered_transactions(date_range, amount_range):
+    df = make_sales()
+    rfm = compute_rfm_cube(build_cube(df, WIDTH), date_range, amount_range, WIDTH)
+    pd.testing.assert_frame_equal(sorted_rfm(rfm), expected_rfm(df, date_range, amount_range))
+
+
+def test_streamed_cube_matches_in_memory_cube(tmp_path):
+    df = make_sales()
+    path = str(tmp_path / 'sales.csv')
+    df.assign(Date=df['Date'].dt.strftime('%m/%d/%Y')).to_csv(path, index=False)
+
+    date_range = ('2019-01-15', '2019-03-01')
+    amount_range = amount_edges(20.0, 149.5, WIDTH)
+    streamed = build_cube_streaming(path, WIDTH, chunksize=300)
+    rfm = compute_rfm_cube(streamed, date_range, amount_range, WIDTH)
+    pd.testing.assert_frame_equal(sorted_rfm(rfm), expected_rfm(df, date_range, amount_range))
@@ -0,0 +1,18 @@
+# Regression checks for the Invoice ID search against a plain substring match
+import pandas as pd
+import pytest
+
+from explorer import build_key_index, search_keys
+from rfm_engine import DEFAULT_CUSTOMER_COL
+
+KEYS = ['750-67-8428', '226-31-3081', '631-41-3108', '123-19-1176', '373-73-7910', '699-14-3026',
+        '355-53-5943', '315-22-5665', 'AB-7', 'ab-75', 'Ünï-750', '7', '']
+
+
+@pytest.mark.parametrize('term', ['7', '75', '750', '-67-', '31-3', '3081', '8428', '750-67-8428', 'ab', 'AB-7',
+                                  'ün', 'ï-75', 'x', '750-67-84289', '-'])
+def test_search_matches_substring(term):
+    rfm = pd.DataFrame({DEFAULT_CUSTOMER_COL: KEYS})
+    index = build_key_index(rfm, DEFAULT_CUSTOMER_COL)
+    expected = rfm.index[rfm[DEFAULT_CUSTOMER_COL].str.lower().str.contains(term.lower(), regex=False)]
+    assert search_keys(index, term).tolist() == expected.tolist()
@@ -0,0 +1,70 @@
+# Regression checks for the incremental RFM refresh against a full rebuild
+import json
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from incremental import refresh_rfm
+from ingest import CACHE_SUFFIX, cache_append_offset, load_sales, read_sales_csv
+from rfm_engine import DEFAULT_CUSTOMER_COL, build_rfm_table
+
+SAMPLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'super_marketsales')
+
+
+def sorted_rfm(rfm):
+    columns = [DEFAULT_CUSTOMER_COL, 'Recency', 'Frequency', 'Monetary', 'R', 'F', 'M', 'Segment']
+    rfm = rfm[columns].sort_values(DEFAULT_CUSTOMER_COL, ignore_index=True)
+    return rfm.astype({'Frequency': 'int64', 'Monetary': 'float64', 'R': 'int64', 'F': 'int64', 'M': 'int64',
+                       'Recency': 'int64', 'Segment': object})
+
+
+def write_sample(tmp_path, trailing_newline):
+    path = str(tmp_path / 'sales.csv')
+    shutil.copyfile(SAMPLE_PATH, path)
+    if not trailing_newline:
+        with open(path, 'rb+') as f:
+            f.seek(-1, os.SEEK_END)
+            f.truncate()
+    return path
+
+
+@pytest.mark.parametrize('trailing_newline', [True, False])
+def test_refresh_matches_full_build(tmp_path, trailing_newline):
+    path = write_sample(tmp_path, trailing_newline)
+    expected = build_rfm_table(load_sales(path, [DEFAULT_CUSTOMER_COL, 'Date', 'Total']))
+
+    # First refresh, then a second one that starts from the saved snapshot
+    for _ in range(2):
+        rfm = refresh_rfm(path)
+        assert len(rfm) == len(expected)
+        pd.testing.assert_frame_equal(sorted_rfm(rfm), sorted_rfm(expected), check_exact=False)
+
+
+def test_unterminated_row_is_counted_once_completed(tmp_path):
+    path = write_sample(tmp_path, trailing_newline=False)
+    refresh_rfm(path)
+    with open(path, 'ab') as f:
+        f.write(b'\n')
+    expected = build_rfm_table(load_sales(path, [DEFAULT_CUSTOMER_COL, 'Date', 'Total']))
+    pd.testing.assert_frame_equal(sorted_rfm(refresh_rfm(path)), sorted_rfm(expected), check_exact=False)
+
+
+def test_sales_cache_extended_by_appended_rows(tmp_path):
+    path = write_sample(tmp_path, trailing_newline=True)
+    with open(path, 'rb') as f:
+        header, *rows = f.read().splitlines(keepends=True)
+    with open(path, 'wb') as f:
+        f.writelines([header] + rows[:600])
+    load_sales(path)
+
+    # Rows appended after the cache was written are parsed on their own
+    with open(path, 'ab') as f:
+        f.writelines(rows[600:])
+    meta = json.loads(open(path + CACHE_SUFFIX + '.json').read())
+    assert cache_append_offset(path, path + CACHE_SUFFIX + '.json') == meta['size']
+
+    expected = read_sales_csv(path)
+    pd.testing.assert_frame_equal(load_sales(path), expected)
+    pd.testing.assert_frame_equal(load_sales(path), expected)
@@ -0,0 +1,98 @@
+# SQLite-backed user store. Lookups go through the username primary key and
+# logins update a single row, so no request has to read or rewrite every user.
+import os
+import pickle
+import sqlite3
+from contextlib import closing
+
+# Database file and the legacy pickle file it replaces
+USERS_DB = os.environ.get('RFM_USERS_DB', 'users.db')
+LEGACY_USERS_FILE = 'users.pkl'
+
+# Seconds a writer waits for a competing write to finish
+BUSY_TIMEOUT = 10
+
+
+# Function to open a connection to the user database
+def connect(db_path=USERS_DB):
+    conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+# Function to create the users table, switch to WAL mode (readers do not block
+# the writer) and migrate users from the legacy pickle file once
+def initialize(db_path=USERS_DB, legacy_path=LEGACY_USERS_FILE):
+    with closing(connect(db_path)) as conn:
+        conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS users (
+                    username TEXT PRIMARY KEY,
+                    password TEXT NOT NULL,
+                    email TEXT,
+                    created_at TEXT,
+                    last_login TEXT
+                ) WITHOUT ROWID
+            """)
+    migrate_pickle(db_path, legacy_path)
+
+
+# Function to copy users from the legacy pickle file, then retire the file
+def migrate_pickle(db_path=USERS_DB, legacy_path=LEGACY_USERS_FILE):
+    if not os.path.exists(legacy_path):
+        return 0
+    try:
+        with open(legacy_path, 'rb') as f:
+            users = pickle.load(f)
+    except (FileNotFoundError, EOFError):
+        users = {}
+
+    rows = [
+        (username, info.get('password'), info.get('email'), info.get('created_at'), info.get('last_login'))
+        for username, info in users.items()
+    ]
+    with closing(connect(db_path)) as conn:
+        with conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO users (username, password, email, created_at, last_login) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+
+    # Keep the old file around under a new name instead of deleting it
+    try:
+        os.replace(legacy_path, legacy_path + '.migrated')
+    except FileNotFoundError:
+        # Another process migrated it first
+        pass
+    return len(rows)
+
+
+# Function to look up one user, or None if the username does not exist
+def get_user(username, db_path=USERS_DB):
+    with closing(connect(db_path)) as conn:
+        row = conn.execute("SELECT * FROM users WHERE username = ?", (username,)).fetchone()
+    return dict(row) if row else None
+
+
+# Function to add a user; returns False if the username is already taken
+def add_user(username, password_hash, email, created_at, db_path=USERS_DB):
+    try:
+        with closing(connect(db_path)) as conn:
+            with conn:
+                conn.execute(
+                    "INSERT INTO users (username, password, email, created_at, last_login) "
+                    "VALUES (?, ?, ?, ?, NULL)",
+                    (username, password_hash, email, created_at)
+                )
+    except sqlite3.IntegrityError:
+        return False
+    return True
+
+
+# Function to record a login for one user
+def update_last_login(username, last_login, db_path=USERS_DB):
+    with closing(connect(db_path)) as conn:
+        with conn:
+            conn.execute("UPDATE users SET last_login = ? WHERE username = ?", (last_login, username))